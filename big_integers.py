@@ -0,0 +1,224 @@
+# big_integers.py
+import math
+import bisect
+import threading
+from types import ModuleType
+from collections import OrderedDict
+from typing import List
+
+LOG10_E = 1 / math.log(10)
+
+# The largest integer result computed exactly, in digits; below Python's default
+# limit of 4300 digits for converting an int to a string
+MAX_EXACT_DIGITS = 4000
+
+
+def _range_product(lo: int, hi: int) -> int:
+    """Returns lo * (lo + 1) * ... * hi, splitting the range so the big multiplications are balanced."""
+    if hi - lo < 16:
+        return math.prod(range(lo, hi + 1))
+    mid = (lo + hi) // 2
+    return _range_product(lo, mid) * _range_product(mid + 1, hi)
+
+
+class ApproximateInteger:
+    """
+    A huge positive integer known only by its base-10 logarithm.
+
+    Returned instead of results too large to compute or print. Supports scaling
+    by positive numbers, which only shifts the logarithm.
+    """
+
+    __slots__ = ("log10",)
+
+    def __init__(self, log10: float):
+        self.log10 = log10
+
+    @property
+    def digits(self) -> int:
+        return math.floor(self.log10) + 1
+
+    def __mul__(self, other):
+        if isinstance(other, ApproximateInteger):
+            return ApproximateInteger(self.log10 + other.log10)
+        if isinstance(other, (int, float)) and other > 0:
+            return ApproximateInteger(self.log10 + math.log10(other))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, ApproximateInteger):
+            log10 = self.log10 - other.log10
+        elif isinstance(other, (int, float)) and other > 0:
+            log10 = self.log10 - math.log10(other)
+        else:
+            return NotImplemented
+        return 10 ** log10 if log10 < 300 else ApproximateInteger(log10)
+
+    def __str__(self) -> str:
+        exponent = math.floor(self.log10)
+        if self.log10 < 1e9:  # The mantissa is still accurate to about six digits
+            return f"≈ {10 ** (self.log10 - exponent):.6f}e+{exponent} ({exponent + 1} digits)"
+        return f"≈ 10^{self.log10:.6e} (about {exponent + 1} digits)"
+
+    __repr__ = __str__
+
+
+class FactorialCache:
+    """
+    Cost-guarded factorial with a cache that grows incrementally.
+
+    The size of n! is estimated with log-gamma before any work is done. Results
+    within the digit limit are computed exactly, starting from the nearest cached
+    smaller factorial when that is closer than computing from scratch, and cached
+    (least recently used entries are evicted). Larger results are returned as an
+    ApproximateInteger from the same log-gamma estimate, in constant time.
+    """
+
+    def __init__(self, max_exact_digits: int = MAX_EXACT_DIGITS, max_input: int = 10 ** 15, max_cached: int = 64):
+        """
+        Args:
+            max_exact_digits (int): The largest result, in digits, computed exactly. Defaults to
+                MAX_EXACT_DIGITS.
+            max_input (int): The largest n accepted; beyond it even the estimate is meaningless.
+                Defaults to 10 ** 15.
+            max_cached (int): The number of exact factorials kept. Defaults to 64.
+        """
+        self.max_exact_digits = max_exact_digits
+        self.max_input = max_input
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._cache: OrderedDict = OrderedDict()  # n -> n!, in recency order
+        self._keys: List[int] = []  # Cached n, sorted
+        self.hits = 0
+        self.extended = 0
+        self.computed = 0
+        self.approximated = 0
+
+    @staticmethod
+    def log10_factorial(n: int) -> float:
+        """Returns log10(n!), via log-gamma."""
+        return math.lgamma(n + 1) * LOG10_E
+
+    def estimate_digits(self, n: int) -> int:
+        """Returns the number of decimal digits of n!."""
+        return math.floor(self.log10_factorial(n)) + 1
+
+    def __call__(self, n):
+        """
+        Returns n!, exactly or as an ApproximateInteger if it exceeds the digit limit.
+
+        Raises:
+            ValueError: If n is not a non-negative integer or exceeds the input limit.
+        """
+        if isinstance(n, float) and n.is_integer():
+            n = int(n)
+        if not isinstance(n, int) or isinstance(n, bool):
+            raise ValueError("factorial() only accepts integral values")
+        if n < 0:
+            raise ValueError("factorial() not defined for negative values")
+        if n > self.max_input:
+            raise ValueError(f"factorial() argument {n} exceeds the limit of {self.max_input}")
+        if self.estimate_digits(n) > self.max_exact_digits:
+            self.approximated += 1
+            return ApproximateInteger(self.log10_factorial(n))
+        return self._exact(n)
+
+    def _exact(self, n: int) -> int:
+        with self._lock:
+            if n in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(n)
+                return self._cache[n]
+            position = bisect.bisect_right(self._keys, n) - 1
+            base = self._keys[position] if position >= 0 else 0
+            base_value = self._cache[base] if position >= 0 else 1
+        # Extending is cheaper than recomputing when the gap is small
+        extend = n - base < n // 2
+        value = base_value * _range_product(base + 1, n) if extend else math.factorial(n)
+        with self._lock:
+            if extend:
+                self.extended += 1
+            else:
+                self.computed += 1
+            if n not in self._cache:
+                self._cache[n] = value
+                bisect.insort(self._keys, n)
+                while len(self._cache) > self.max_cached:
+                    evicted, _ = self._cache.popitem(last=False)
+                    del self._keys[bisect.bisect_left(self._keys, evicted)]
+        return value
+
+
+def guarded_pow(base, exponent, max_exact_digits: int = MAX_EXACT_DIGITS):
+    """
+    Returns base ** exponent, or an ApproximateInteger for integer powers too large to compute.
+
+    The size of an integer power is estimated from logarithms before any work is
+    done, as for factorials; all other operands are passed on to `**` unchanged.
+
+    Raises:
+        OverflowError: If a negative integer power exceeds the digit limit, or the estimate itself overflows.
+    """
+    if (isinstance(base, int) and isinstance(exponent, int) and not isinstance(exponent, bool)
+            and abs(base) > 1 and exponent > 0):
+        log10 = exponent * math.log10(abs(base))
+        if math.floor(log10) + 1 > max_exact_digits:
+            if base < 0 and exponent % 2:
+                raise OverflowError(f"integer power with about {math.floor(log10) + 1} digits is too large")
+            return ApproximateInteger(log10)
+    return base ** exponent
+
+
+# Factorials requested anywhere share one cache
+factorials = FactorialCache()
+
+# The math module as seen by evaluated expressions, with the guarded factorial and power
+guarded_math = ModuleType("math")
+guarded_math.__dict__.update(vars(math), factorial=factorials, guarded_pow=guarded_pow)
+
+
+# Test for big_integers.py
+if __name__ == "__main__":
+    import time
+    print("Testing big_integers.py...")
+    cache = FactorialCache()
+    assert cache(0) == 1 and cache(5) == 120
+    assert cache(1000) == math.factorial(1000)
+    assert cache(1200) == math.factorial(1200) and cache.extended == 1  # Extended from 1000!
+    assert cache(1000) == math.factorial(1000) and cache.hits == 1
+    assert cache(5.0) == 120
+    for n in (1, 10, 170, 1000, 1500):
+        assert cache.estimate_digits(n) == len(str(math.factorial(n)))
+    for bad in (-1, 2.5, 10 ** 16):
+        try:
+            cache(bad)
+            raise AssertionError(f"Expected ValueError for {bad}")
+        except ValueError:
+            pass
+
+    start = time.perf_counter()
+    huge = cache(1000000)
+    elapsed = time.perf_counter() - start
+    print(f"factorial(1000000) = {huge} in {elapsed * 1e6:.1f} us")
+    assert isinstance(huge, ApproximateInteger) and huge.digits == 5565709
+    assert str(huge).startswith("≈ 8.263932e+5565708")  # 8.2639316883...e+5565708
+    assert math.isclose(huge / cache(999999), 1e6)
+    print(f"factorial(10 ** 14) = {cache(10 ** 14)}")
+
+    assert guarded_pow(2, 10) == 1024 and guarded_pow(-3, 3) == -27 and guarded_pow(2, -1) == 0.5
+    assert guarded_pow(2.0, 3) == 8.0 and guarded_pow(1, 10 ** 100) == 1
+    assert guarded_pow(10, 3999) == 10 ** 3999
+    start = time.perf_counter()
+    huge = guarded_pow(9, 9 ** 9)
+    elapsed = time.perf_counter() - start
+    print(f"9 ** 9 ** 9 = {huge} in {elapsed * 1e6:.1f} us")
+    assert isinstance(huge, ApproximateInteger) and huge.digits == 369693100
+    assert guarded_pow(2, 100000).digits == 30103 and guarded_pow(-2, 100000).digits == 30103
+    try:
+        guarded_pow(-2, 100001)
+        raise AssertionError("Expected OverflowError")
+    except OverflowError:
+        pass
+    print("All tests passed!")
@@ -1,16 +1,27 @@
 # chatbot.py
-from math_utils import MathUtils
+from math_utils import RESULT_PREFIXES, MathUtils
 from language_utils import LanguageUtils
 from snn import SpikingNeuralNetwork
+from logging_utils import setup_logging
+from history import MathHistory
+from spike_encoder import SpikeEncoder
+from diagnostics import Diagnostics
 from test_suite import test_cases  # Import the test cases
 
 
 class ChatBot:
-    def __init__(self):
+    def __init__(self, run_tests: bool = True, history_db: str | None = None, learn_from_traffic: bool = False):
         self.snn = SpikingNeuralNetwork()
         self.math_utils = MathUtils()
         self.language_utils = LanguageUtils()
-        self.run_test_suite()  # Run the test suite upon initialization
+        self.history = MathHistory(history_db) if history_db else None
+        # Feed every input to the SNN as spikes on a background thread
+        self.spike_encoder = SpikeEncoder(
+            self.snn, self.language_utils.math_keywords, self.math_utils.supported_functions
+        ) if learn_from_traffic else None
+        self.diagnostics = Diagnostics()
+        if run_tests:
+            self.run_test_suite()  # Run the test suite upon initialization
 
     def run_test_suite(self):
         """Run the test suite and print the results."""
@@ -23,17 +34,33 @@ class ChatBot:
 
     def respond(self, user_input: str) -> str:
         """Handle user input: variable assignment, math expression evaluation, or natural language math."""
+        if self.spike_encoder is not None:
+            self.spike_encoder.submit(user_input)
+        return self.diagnostics.profile_call(self._respond, user_input)
+
+    def _respond(self, user_input: str) -> str:
         try:
             if user_input.strip() == "get_variables":
                 return self.get_variables()
-            elif '=' in user_input:
+            elif user_input.strip().split(' ', 1)[0] in ("profile", "mem"):
+                return self.run_diagnostics(user_input.strip())
+            elif user_input.strip().split(' ', 1)[0] == "history":
+                return self.query_history(user_input.strip())
+            elif ';' in user_input or '\n' in user_input:
+                return self._record(user_input, self.run_script(user_input))
+            elif '=' in user_input and '@' not in user_input:  # '@' marks matrix files, e.g. out=@a.npy
                 var_name, var_value = user_input.split('=', 1)
                 var_name, var_value = var_name.strip(), var_value.strip()
                 error = self.math_utils.math_validate.validate_variable_name(var_name)
                 if error:
                     raise ValueError(error)
-                self.math_utils.set_variable(var_name, float(var_value))
-                return f"Bot: Variable '{var_name}' set to {var_value}."
+                try:
+                    value = float(var_value)
+                except ValueError:
+                    recomputed = self.math_utils.set_formula(var_name, var_value)
+                    return f"Bot: Formula '{var_name}' set to {var_value}.{self._describe(recomputed)}"
+                recomputed = self.math_utils.set_variable(var_name, value)
+                return f"Bot: Variable '{var_name}' set to {var_value}.{self._describe(recomputed)}"
             elif self.language_utils.is_math_question(user_input):
                 math_expr = self.language_utils.convert_to_math(user_input)
                 print(f"Debug: Converted '{user_input}' to '{math_expr}'")  # Debug print
@@ -42,13 +69,13 @@ class ChatBot:
                 # Suggest optimizations using the SNN
                 optimized_expr = self.snn.analyze_expression(math_expr)
                 if optimized_expr:
-                    return f"Bot: The result is {result}. Suggested optimization: {optimized_expr}"
+                    return self._record(user_input, f"Bot: The result is {result}. Suggested optimization: {optimized_expr}")
                 else:
-                    return f"Bot: The result is {result}."
+                    return self._record(user_input, f"Bot: The result is {result}.")
             elif 'd/dx' in user_input or 'integrate' in user_input:
-                return self.math_utils.evaluate_calculus(user_input)
+                return self._record(user_input, self.math_utils.evaluate_calculus(user_input))
             elif 'det' in user_input or 'inv' in user_input:
-                return self.math_utils.evaluate_linear_algebra(user_input)
+                return self._record(user_input, self.math_utils.evaluate_linear_algebra(user_input))
             else:
                 error = self.math_utils.math_validate.validate_math_expression(user_input)
                 if error:
@@ -57,12 +84,103 @@ class ChatBot:
                 # Suggest optimizations using the SNN
                 optimized_expr = self.snn.analyze_expression(user_input)
                 if optimized_expr:
-                    return f"Bot: The result is {result}. Suggested optimization: {optimized_expr}"
+                    return self._record(user_input, f"Bot: The result is {result}. Suggested optimization: {optimized_expr}")
                 else:
-                    return f"Bot: The result is {result}."
+                    return self._record(user_input, f"Bot: The result is {result}.")
         except (ValueError, ZeroDivisionError, SyntaxError, NameError, Exception) as e:
             return f"Bot: Error - {e}"
 
+    def run_script(self, script: str) -> str:
+        """Evaluate several statements separated by `;` or newlines, reporting each result."""
+        results, unique, parsed = self.math_utils.evaluate_script(script)
+        if not results:
+            raise ValueError("The script contains no statements.")
+        response = f"Bot: Script results ({unique} unique of {parsed} subexpressions evaluated):\n"
+        for statement, value, error in results:
+            response += f"- {statement} -> {value if error is None else 'Error - ' + error}\n"
+        return response
+
+    def _describe(self, recomputed: list) -> str:
+        """Describe the formulas recomputed after a variable or formula changed."""
+        if not recomputed:
+            return ""
+        variables = self.math_utils.get_variables()
+        values = ", ".join(f"{name} = {variables.get(name, 'undefined')}" for name in recomputed)
+        return f" Recomputed: {values}."
+
+    def _record(self, user_input: str, response: str) -> str:
+        """Store a successfully evaluated operation in the history, if enabled."""
+        if self.history is not None and response.startswith(("Bot: ", *RESULT_PREFIXES)):
+            self.history.record(user_input.strip(), response)
+        return response
+
+    def query_history(self, command: str) -> str:
+        """
+        Answer history commands, one page at a time:
+        `history [before <id>]`, `history search <terms> [after <id>]`,
+        `history top [n]` and `history range <start> <end> [after <time>:<id>]`.
+        """
+        if self.history is None:
+            return "Bot: History is not enabled."
+        page_size = 20
+        words = command.split()[1:]
+        action = words[0] if words else "recent"
+        cursor = None
+        if len(words) >= 2 and words[-2] in ("after", "before"):
+            cursor = words[-1]
+            words = words[:-2]
+        if action == "top":
+            top = self.history.most_frequent(int(words[1]) if len(words) > 1 else 10)
+            if not top:
+                return "Bot: No history yet."
+            return "Bot: Most frequent operations:\n" + "".join(f"- {op} ({count}x)\n" for op, count in top)
+        elif action == "search":
+            terms = " ".join(words[1:])
+            rows = self.history.search(terms, page_size, after_id=int(cursor or 0))
+            next_page = f"history search {terms} after {rows[-1][0]}" if rows else None
+        elif action == "range":
+            if len(words) != 3:
+                raise ValueError("Usage: history range <start> <end> [after <time>:<id>]")
+            start, end = self.history.parse_time(words[1]), self.history.parse_time(words[2])
+            after = None
+            if cursor:
+                created_at, row_id = cursor.split(':')
+                after = (float(created_at), int(row_id))
+            rows = self.history.time_range(start, end, page_size, after=after)
+            next_page = f"history range {words[1]} {words[2]} after {rows[-1][1]!r}:{rows[-1][0]}" if rows else None
+        elif action in ("recent", "before") or cursor:
+            rows = self.history.recent(page_size, before_id=int(cursor) if cursor else None)
+            next_page = f"history before {rows[-1][0]}" if rows else None
+        else:
+            raise ValueError(f"Unknown history command '{action}'. Use search, top, range or recent.")
+        if not rows:
+            return "Bot: No matching history."
+        history_string = "Bot: History:\n"
+        for row_id, _, operation, result in rows:
+            history_string += f"- #{row_id} {operation} -> {result}\n"
+        if len(rows) == page_size:
+            history_string += f"Next page: {next_page}\n"
+        return history_string
+
+    def run_diagnostics(self, command: str) -> str:
+        """
+        Answer diagnostics commands: `profile start [requests]`, `profile stop [file.prof]`,
+        `mem snapshot [file.snapshot]` and `mem stop`. Files are written inside the
+        diagnostics output directory.
+        """
+        words = command.split()
+        action = " ".join(words[:2])
+        argument = words[2] if len(words) > 2 else None
+        if action == "profile start":
+            return self.diagnostics.profile_start(int(argument) if argument else None)
+        elif action == "profile stop":
+            return self.diagnostics.profile_stop(argument)
+        elif action == "mem snapshot":
+            return self.diagnostics.mem_snapshot(argument)
+        elif action == "mem stop":
+            return self.diagnostics.mem_stop()
+        raise ValueError("Usage: profile start [requests], profile stop [file], mem snapshot [file] or mem stop")
+
     def get_variables(self) -> str:
         """Return a formatted string of currently defined variables."""
         variables = self.math_utils.get_variables()
@@ -76,7 +194,8 @@ class ChatBot:
 
 # Main entry point to run the chatbot
 if __name__ == "__main__":
-    chatbot = ChatBot()  # This will automatically run the test suite
+    setup_logging()
+    chatbot = ChatBot(history_db="chatbot.db", learn_from_traffic=True)  # This will automatically run the test suite
 
     # Interactive loop for user input
     print("\nChatBot is ready! Type your math expressions or commands. Type 'exit' to quit.")
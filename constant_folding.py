@@ -0,0 +1,169 @@
+# constant_folding.py
+import ast
+import math
+from typing import Any, Callable, Dict, Tuple
+
+from big_integers import guarded_pow
+
+# Exact sines of the first-quadrant angles; every common angle reduces to one of these
+_FIRST_QUADRANT_SINES = {0: 0.0, 30: 0.5, 45: math.sqrt(2) / 2, 60: math.sqrt(3) / 2, 90: 1.0}
+
+# Common angles in degrees: the multiples of 30 and 45 in [-360, 360]
+COMMON_DEGREES = [d for d in range(-360, 361, 15) if d % 30 == 0 or d % 45 == 0]
+
+# Degree -> radians, computed once
+RADIANS_BY_DEGREE: Dict[float, float] = {float(d): math.radians(d) for d in COMMON_DEGREES}
+
+
+def _exact_sine(degrees: int) -> float:
+    """Returns the correctly rounded sine of a common angle, using the quadrant symmetries."""
+    degrees %= 360
+    sign = 1.0
+    if degrees >= 180:
+        degrees, sign = degrees - 180, -1.0
+    if degrees > 90:
+        degrees = 180 - degrees
+    value = _FIRST_QUADRANT_SINES[degrees]
+    return sign * value if value else 0.0
+
+
+def _exact_trig_table() -> Dict[Tuple[str, float], float]:
+    """Builds (function, radians) -> exact value for the common angles."""
+    table = {}
+    for degrees in COMMON_DEGREES:
+        radians = RADIANS_BY_DEGREE[float(degrees)]
+        sine, cosine = _exact_sine(degrees), _exact_sine(degrees + 90)
+        table["sin", radians] = sine
+        table["cos", radians] = cosine
+        if cosine:  # tan is undefined at odd multiples of 90 degrees
+            table["tan", radians] = sine / cosine
+    return table
+
+
+# Keyed by the radians a common degree angle converts to, so that `sin of 30 degrees`
+# folds to exactly 0.5 instead of sin(0.5235987755982988) = 0.49999999999999994
+EXACT_TRIG: Dict[Tuple[str, float], float] = _exact_trig_table()
+
+
+class ConstantFolder(ast.NodeTransformer):
+    """
+    Collapses variable-free subtrees of an expression into constants.
+
+    Arithmetic on constants, constant attributes of the math module (`math.pi`) and
+    calls of supported math functions with constant arguments are evaluated once,
+    at compile time; trigonometric calls on common angles use the exact table. A
+    subtree whose evaluation raises is left as it is, so the error surfaces at
+    evaluation time exactly as before. Powers become calls of `math.guarded_pow`,
+    so huge integer powers are estimated instead of computed, here and when the
+    code is evaluated with `big_integers.guarded_math` as `math`.
+    """
+
+    def __init__(self, functions: Dict[str, Any]):
+        """
+        Args:
+            functions (Dict[str, Any]): The names callable as `math.<name>`, e.g. `MathUtils.supported_functions`.
+        """
+        self.functions = functions
+
+    def _fold(self, node: ast.AST, compute: Callable[[], Any]) -> ast.AST:
+        try:
+            value = compute()
+        except Exception:
+            return node
+        if not isinstance(value, (int, float)):
+            return node
+        return ast.copy_location(ast.Constant(value), node)
+
+    def _math_name(self, node: ast.AST) -> str | None:
+        """Returns the attribute of a supported `math.<name>` reference, otherwise None."""
+        if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "math"
+                and node.attr in self.functions and hasattr(math, node.attr)):
+            return node.attr
+        return None
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            function = ast.Attribute(ast.Name("math", ast.Load()), "guarded_pow", ast.Load())
+            call = ast.copy_location(ast.Call(function, [node.left, node.right], []), node)
+            if isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+                return self._fold(call, lambda: guarded_pow(node.left.value, node.right.value))
+            return call
+        if isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+            return self._fold(node, lambda: eval(compile(ast.Expression(node), '<fold>', 'eval'), {"__builtins__": None}))
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.operand, ast.Constant):
+            return self._fold(node, lambda: eval(compile(ast.Expression(node), '<fold>', 'eval'), {"__builtins__": None}))
+        return node
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        name = self._math_name(node)
+        if name is not None and not callable(self.functions[name]):
+            return self._fold(node, lambda: self.functions[name])
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        self.generic_visit(node)
+        name = self._math_name(node.func)
+        if name is None or node.keywords or not all(isinstance(arg, ast.Constant) for arg in node.args):
+            return node
+        args = [arg.value for arg in node.args]
+        if len(args) == 1 and (name, args[0]) in EXACT_TRIG:
+            return ast.copy_location(ast.Constant(EXACT_TRIG[name, args[0]]), node)
+        return self._fold(node, lambda: self.functions[name](*args))
+
+
+def fold_constants(source: str, functions: Dict[str, Any]):
+    """
+    Parses an expression, folds its constant subtrees and compiles what is left.
+
+    Args:
+        source (str): A Python expression over `math.<name>` functions and variables.
+        functions (Dict[str, Any]): The supported math function names.
+
+    Returns:
+        The expression's value if it folded completely, otherwise a compiled code object.
+
+    Raises:
+        SyntaxError: If the expression cannot be parsed.
+    """
+    tree = ConstantFolder(functions).visit(ast.parse(source.strip(), mode='eval'))
+    if isinstance(tree.body, ast.Constant):
+        return tree.body.value
+    return compile(ast.fix_missing_locations(tree), '<expression>', 'eval')
+
+
+# Test for constant_folding.py
+if __name__ == "__main__":
+    from big_integers import guarded_math
+    print("Testing constant_folding.py...")
+    functions = {"sin": math.sin, "cos": math.cos, "tan": math.tan, "sqrt": math.sqrt, "pi": math.pi}
+    assert fold_constants(f"math.sin({math.radians(30)})", functions) == 0.5
+    assert fold_constants(f"math.cos({math.radians(60)})", functions) == 0.5
+    assert fold_constants(f"math.tan({math.radians(45)})", functions) == 1.0
+    assert fold_constants(f"math.sin({math.radians(-90)})", functions) == -1.0
+    assert fold_constants("(5 + 3) * 4 + math.sqrt(16)", functions) == 36.0
+    assert fold_constants("2 * math.pi", functions) == 2 * math.pi
+    # Variables keep their subtree; the constant part is folded
+    code = fold_constants("x * math.sqrt(4 * 4)", functions)
+    assert eval(code, {"__builtins__": None}, {"math": math, "x": 2}) == 8.0
+    assert "sqrt" not in code.co_names
+    # Errors are left for evaluation time
+    code = fold_constants("1 / 0", functions)
+    try:
+        eval(code, {"__builtins__": None}, {})
+        raise AssertionError("Expected ZeroDivisionError")
+    except ZeroDivisionError:
+        pass
+    # Integer powers are size-guarded like factorials; huge ones are left to evaluate in constant time
+    assert fold_constants("2 ** 10 + 2 ** -1", functions) == 1024.5
+    code = fold_constants("9 ** 9 ** 9", functions)
+    assert eval(code, {"__builtins__": None}, {"math": guarded_math}).digits == 369693100
+    code = fold_constants("x ** 100000", functions)
+    assert eval(code, {"__builtins__": None}, {"math": guarded_math, "x": 2}).digits == 30103
+    worst = max(abs(EXACT_TRIG[f, r] - getattr(math, f)(r)) for f, r in EXACT_TRIG if abs(EXACT_TRIG[f, r]) <= 1)
+    print(f"{len(EXACT_TRIG)} exact angle values; largest correction {worst:.1e}")
+    print("All tests passed!")
@@ -0,0 +1,279 @@
+# diagnostics.py
+import os
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+from safe_paths import resolve_in_directory
+
+logger = logging.getLogger(__name__)
+
+# Allocations are attributed to the subsystem of the innermost matching frame
+SUBSYSTEMS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("SNN", ("snn.py", "snn_sharded.py", "spike_encoder.py")),
+    ("SymPy", (f"{os.sep}sympy{os.sep}",)),
+    ("caches", ("single_flight.py", "history.py", "functools.py", f"{os.sep}re{os.sep}", "sre_compile.py")),
+    ("variables", ("math_utils.py", "math_validate.py")),
+)
+
+
+def _subsystem(traceback: tracemalloc.Traceback) -> str:
+    """Returns the subsystem an allocation belongs to, or "other"."""
+    for frame in reversed(traceback):  # Most recent frame last
+        for name, patterns in SUBSYSTEMS:
+            if any(pattern in frame.filename for pattern in patterns):
+                return name
+    return "other"
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class Diagnostics:
+    """
+    On-demand CPU profiling and memory snapshots of a running chatbot.
+
+    Profiling covers a bounded window of requests: each request in the window runs
+    under its own cProfile profiler (profilers are per thread) and the results are
+    merged, so concurrent requests can be profiled and requests outside the window
+    pay only a flag check. Memory snapshots use tracemalloc with a bounded
+    traceback depth and group the traced allocations by subsystem; tracing is
+    also a bounded window, ended by the snapshot or after `max_trace_seconds`.
+    Reports are written only inside `output_dir`.
+    """
+
+    def __init__(self, max_requests: int = 1000, top: int = 20, trace_frames: int = 10,
+                 max_trace_seconds: float = 60.0, output_dir: str = "diagnostics"):
+        """
+        Args:
+            max_requests (int): The default number of requests profiled per window. Defaults to 1000.
+            top (int): The number of functions and subsystems listed in reports. Defaults to 20.
+            trace_frames (int): Frames stored per traced allocation. Defaults to 10.
+            max_trace_seconds (float): Memory tracing stops after this long without a snapshot.
+                Defaults to 60.0.
+            output_dir (str): The directory profile and snapshot files are written to. Defaults to "diagnostics".
+        """
+        self.max_requests = max_requests
+        self.top = top
+        self.trace_frames = trace_frames
+        self.max_trace_seconds = max_trace_seconds
+        self.output_dir = os.path.abspath(output_dir)
+        self._trace_timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._profiled = 0
+        self._skipped = 0
+        self._stats: pstats.Stats | None = None
+        self._profile_started: float | None = None
+
+    @property
+    def profiling(self) -> bool:
+        return self._remaining > 0
+
+    def _output_path(self, path: str, extensions: Tuple[str, ...]) -> str:
+        """Resolves a report path inside output_dir, creating its directory."""
+        resolved = resolve_in_directory(self.output_dir, path, extensions, "Diagnostics")
+        os.makedirs(os.path.dirname(resolved), exist_ok=True)
+        return resolved
+
+    def profile_start(self, max_requests: int | None = None) -> str:
+        """
+        Starts a profiling window, discarding the results of a previous one.
+
+        Args:
+            max_requests (int | None): The number of requests to profile. Defaults to max_requests.
+
+        Returns:
+            str: A confirmation message.
+        """
+        max_requests = max_requests or self.max_requests
+        if max_requests < 1:
+            raise ValueError("The profiling window must cover at least one request.")
+        with self._lock:
+            self._remaining = max_requests
+            self._profiled = self._skipped = 0
+            self._stats = None
+            self._profile_started = time.perf_counter()
+        logger.info("Profiling the next %d requests.", max_requests)
+        return f"Bot: Profiling the next {max_requests} requests."
+
+    def profile_call(self, func: Callable, *args) -> Any:
+        """Runs func(*args), under a profiler if the current window has requests left."""
+        if self._remaining <= 0:
+            return func(*args)
+        with self._lock:
+            in_window = self._remaining > 0
+            self._remaining -= in_window
+        if not in_window:
+            return func(*args)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiler is active in this thread
+            with self._lock:
+                self._skipped += 1
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._profiled += 1
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+
+    def profile_stop(self, path: str | None = None) -> str:
+        """
+        Ends the profiling window and reports the hottest functions by cumulative time.
+
+        Args:
+            path (str | None): Writes the merged profile here (pstats format), if given; a
+                `.prof` path relative to output_dir.
+
+        Returns:
+            str: The report.
+
+        Raises:
+            ValueError: If the path is not allowed (see `resolve_in_directory`).
+        """
+        target = self._output_path(path, (".prof",)) if path else None
+        with self._lock:
+            if self._profile_started is None:
+                return "Bot: Profiling has not been started. Use 'profile start [requests]'."
+            stats, profiled, skipped = self._stats, self._profiled, self._skipped
+            elapsed = time.perf_counter() - self._profile_started
+            self._remaining = 0
+            self._stats = None
+            self._profile_started = None
+        if stats is None:
+            return "Bot: No requests were profiled."
+        if path:
+            stats.dump_stats(target)
+        hottest = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        report = f"Bot: Profiled {profiled} requests over {elapsed:.1f}s"
+        report += f" ({skipped} skipped).\n" if skipped else ".\n"
+        report += "Hot functions (calls, own time, cumulative time):\n"
+        for (filename, line, function), (_, calls, own, cumulative, _) in hottest:
+            location = f"{os.path.basename(filename)}:{line}" if line else filename
+            report += f"- {function} ({location}): {calls}, {own * 1000:.1f} ms, {cumulative * 1000:.1f} ms\n"
+        if path:
+            report += f"Profile written to {path}.\n"
+        return report
+
+    def mem_snapshot(self, path: str | None = None) -> str:
+        """
+        Reports traced memory grouped by subsystem.
+
+        The first call starts tracing; the next call takes the snapshot and stops it.
+        Tracing also stops by itself after max_trace_seconds, so the overhead is bounded.
+
+        Args:
+            path (str | None): Writes the raw snapshot here (tracemalloc format), if given; a
+                `.snapshot` path relative to output_dir.
+
+        Returns:
+            str: The report.
+
+        Raises:
+            ValueError: If the path is not allowed (see `resolve_in_directory`).
+        """
+        target = self._output_path(path, (".snapshot",)) if path else None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            with self._lock:
+                self._trace_timer = threading.Timer(self.max_trace_seconds, self._stop_tracing)
+                self._trace_timer.daemon = True
+                self._trace_timer.start()
+            logger.info("Started tracing allocations with %d frames for at most %gs.",
+                        self.trace_frames, self.max_trace_seconds)
+            return ("Bot: Memory tracing started; allocations made from now on are tracked for up to "
+                    f"{self.max_trace_seconds:g}s. Run 'mem snapshot' again to see them.")
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        self._stop_tracing()
+        if path:
+            snapshot.dump(target)
+        totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for statistic in snapshot.statistics('traceback'):
+            total = totals[_subsystem(statistic.traceback)]
+            total[0] += statistic.size
+            total[1] += statistic.count
+        report = f"Bot: Memory by subsystem (traced {_format_size(current)}, peak {_format_size(peak)}):\n"
+        for name, (size, count) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:self.top]:
+            report += f"- {name}: {_format_size(size)} in {count} blocks\n"
+        if path:
+            report += f"Snapshot written to {path}.\n"
+        return report + "Memory tracing stopped; run 'mem snapshot' to start a new window.\n"
+
+    def _stop_tracing(self) -> None:
+        """Ends the tracing window, from a snapshot, `mem stop` or the timer."""
+        with self._lock:
+            if self._trace_timer is not None:
+                self._trace_timer.cancel()
+                self._trace_timer = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logger.info("Stopped tracing allocations.")
+
+    def mem_stop(self) -> str:
+        """Stops tracing allocations and frees the traces."""
+        if not tracemalloc.is_tracing():
+            return "Bot: Memory tracing is not running."
+        self._stop_tracing()
+        return "Bot: Memory tracing stopped."
+
+
+# Test for diagnostics.py
+if __name__ == "__main__":
+    import tempfile
+    from snn import SpikingNeuralNetwork
+    print("Testing diagnostics.py...")
+    diagnostics = Diagnostics(top=5)
+    print(diagnostics.profile_start(3))
+    results = [diagnostics.profile_call(sum, range(n * 100000)) for n in range(5)]
+    assert results[2] == sum(range(200000)) and not diagnostics.profiling
+    with tempfile.TemporaryDirectory() as directory:
+        diagnostics.output_dir = os.path.join(directory, "diagnostics")
+        # Paths typed in chat cannot leave the output directory
+        for bad in (os.path.join(directory, "outside.prof"), "../outside.prof", "requests.txt"):
+            try:
+                diagnostics.profile_stop(bad)
+                raise AssertionError(f"Expected ValueError for {bad}")
+            except ValueError:
+                pass
+        assert not os.path.exists(os.path.join(directory, "outside.prof"))
+        report = diagnostics.profile_stop("requests.prof")
+        print(report)
+        assert "Profiled 3 requests" in report
+        assert pstats.Stats(os.path.join(diagnostics.output_dir, "requests.prof")).total_calls > 0
+
+        print(diagnostics.mem_snapshot())
+        snn = SpikingNeuralNetwork()
+        for i in range(500):
+            snn.add_neuron(f"entity{i}")
+        report = diagnostics.mem_snapshot("memory.snapshot")
+        print(report)
+        assert "- SNN:" in report and not tracemalloc.is_tracing()  # The snapshot ends the window
+        assert tracemalloc.Snapshot.load(os.path.join(diagnostics.output_dir, "memory.snapshot")).traces
+    # An abandoned tracing window stops by itself
+    diagnostics.max_trace_seconds = 0.1
+    print(diagnostics.mem_snapshot())
+    time.sleep(0.5)
+    assert not tracemalloc.is_tracing()
+    print(diagnostics.mem_stop())
+    print("All tests passed!")
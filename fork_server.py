@@ -0,0 +1,165 @@
+# fork_server.py
+import gc
+import io
+import time
+import pickle
+import logging
+import contextlib
+import multiprocessing as mp
+from typing import Callable
+
+import sympy as sp
+
+from chatbot import ChatBot
+from history import MathHistory
+from logging_utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+class ForkServer:
+    """
+    Spawns ChatBot workers by forking a pre-warmed parent.
+
+    The parent imports SymPy and NumPy, warms SymPy's caches, builds a ChatBot
+    (function tables and compiled LanguageUtils regexes) and optionally loads a
+    pickled SNN once. Workers are then forked on demand and share those pages
+    copy-on-write, so a new worker is ready in milliseconds.
+
+    Fork copies only the calling thread, so the server should be created and
+    used from a process that has no other busy threads.
+    """
+
+    def __init__(self, snn_state_path: str | None = None, history_db: str | None = None):
+        """
+        Args:
+            snn_state_path (str | None): A pickled SpikingNeuralNetwork to load into the ChatBot.
+            history_db (str | None): The history database each worker opens for its ChatBot.
+        """
+        self.snn_state_path = snn_state_path
+        self.history_db = history_db
+        self.chatbot: ChatBot | None = None
+        self._context = mp.get_context("fork")
+
+    def warm(self) -> float:
+        """
+        Builds and warms the shared ChatBot; called automatically by the first spawn.
+
+        Returns:
+            float: The warm-up time in seconds.
+        """
+        start = time.perf_counter()
+        x = sp.symbols('x')
+        sp.diff(sp.sympify("x**2 + sin(x)"), x)  # Populate SymPy's caches
+        with contextlib.redirect_stdout(io.StringIO()):
+            chatbot = ChatBot(run_tests=False)
+            chatbot.respond("What is 5 plus 5?")  # Exercise the LanguageUtils regexes
+        if self.snn_state_path:
+            with open(self.snn_state_path, "rb") as f:
+                chatbot.snn = pickle.load(f)
+        self.chatbot = chatbot
+        # Move everything built so far out of the collector's reach, so collections
+        # in workers do not write to (and copy) the shared pages
+        gc.collect()
+        gc.freeze()
+        elapsed = time.perf_counter() - start
+        logger.info("Fork server warmed up in %.2fs.", elapsed)
+        return elapsed
+
+    def spawn(self, target: Callable, *args) -> mp.Process:
+        """
+        Forks a worker that runs target(chatbot, *args) with the pre-warmed ChatBot.
+
+        Args:
+            target (Callable): The worker entry point; receives the ChatBot first.
+            *args: Further arguments passed to target.
+
+        Returns:
+            mp.Process: The started worker process.
+        """
+        if self.chatbot is None:
+            self.warm()
+        process = self._context.Process(target=self._bootstrap, args=(target, args), daemon=True)
+        process.start()
+        return process
+
+    def _bootstrap(self, target: Callable, args: tuple) -> None:
+        """Runs in the forked worker: opens per-process resources, then calls target."""
+        if self.history_db:
+            self.chatbot.history = MathHistory(self.history_db)
+        target(self.chatbot, *args)
+
+
+def _report_ready(chatbot: ChatBot, conn) -> None:
+    """Benchmark worker: answer one request and report when ready."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = chatbot.respond("5 * 6")
+    conn.send((time.perf_counter(), response))
+    conn.close()
+
+
+def _report_snn(chatbot: ChatBot, conn) -> None:
+    """Test worker: report the loaded SNN's entities and time, then step it."""
+    snn = chatbot.snn
+    result = snn.step([("loaded", 1.0)])
+    conn.send((sorted(snn.entity_to_neuron), result["current_time"]))
+    conn.close()
+
+
+def _cold_worker(conn) -> None:
+    """Benchmark worker started with the spawn method: build everything from scratch."""
+    from chatbot import ChatBot
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot = ChatBot(run_tests=False)
+    _report_ready(chatbot, conn)
+
+
+# Test for fork_server.py
+if __name__ == "__main__":
+    setup_logging()
+    print("Testing fork_server.py...")
+    # Cold spawn: a fresh interpreter imports and builds everything
+    parent_conn, child_conn = mp.Pipe()
+    start = time.perf_counter()
+    cold = mp.get_context("spawn").Process(target=_cold_worker, args=(child_conn,))
+    cold.start()
+    ready_at, response = parent_conn.recv()
+    cold.join()
+    cold_seconds = ready_at - start
+    assert response == "Bot: The result is 30."
+
+    # Fork-server spawn: fork the warmed parent
+    server = ForkServer()
+    server.warm()
+    timings = []
+    for _ in range(5):
+        parent_conn, child_conn = mp.Pipe()
+        start = time.perf_counter()
+        worker = server.spawn(_report_ready, child_conn)
+        ready_at, response = parent_conn.recv()
+        worker.join()
+        timings.append(ready_at - start)
+        assert response == "Bot: The result is 30."
+
+    # A pickled SNN is loaded once by the parent and inherited by every worker
+    import os
+    import tempfile
+    from snn import SpikingNeuralNetwork
+    snn = SpikingNeuralNetwork()
+    for name in ("loaded", "other"):
+        snn.add_neuron(name)
+    snn.step([("loaded", 1.0), ("other", 0.0)])
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, "snn.pickle")
+        with open(state_path, "wb") as f:
+            pickle.dump(snn, f)
+        snn_server = ForkServer(snn_state_path=state_path)
+        parent_conn, child_conn = mp.Pipe()
+        worker = snn_server.spawn(_report_snn, child_conn)
+        entities, current_time = parent_conn.recv()
+        worker.join()
+    assert entities == ["loaded", "other"] and current_time == 2
+    assert snn_server.chatbot.snn.current_time == 1  # The worker stepped its own copy
+    print(f"Cold spawn ready in {cold_seconds * 1000:.1f} ms")
+    print(f"Fork-server spawn ready in {min(timings) * 1000:.1f} ms (best of {len(timings)})")
+    print("All tests passed!")
@@ -0,0 +1,255 @@
+# history.py
+import time
+import sqlite3
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+HISTORY_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_math_operations_created_at
+    ON math_operations (created_at, id, operation, result);
+CREATE TABLE IF NOT EXISTS math_operation_counts (
+    operation TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_math_operation_counts_count
+    ON math_operation_counts (count DESC, operation);
+CREATE VIRTUAL TABLE IF NOT EXISTS math_operations_fts USING fts5(
+    operation, content='math_operations', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS math_operations_ai AFTER INSERT ON math_operations BEGIN
+    INSERT INTO math_operations_fts (rowid, operation) VALUES (new.id, new.operation);
+    INSERT INTO math_operation_counts (operation, count) VALUES (new.operation, 1)
+        ON CONFLICT (operation) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS math_operations_ad AFTER DELETE ON math_operations BEGIN
+    INSERT INTO math_operations_fts (math_operations_fts, rowid, operation) VALUES ('delete', old.id, old.operation);
+    UPDATE math_operation_counts SET count = count - 1 WHERE operation = old.operation;
+END;
+CREATE TRIGGER IF NOT EXISTS math_operations_au AFTER UPDATE OF id, operation ON math_operations BEGIN
+    INSERT INTO math_operations_fts (math_operations_fts, rowid, operation) VALUES ('delete', old.id, old.operation);
+    INSERT INTO math_operations_fts (rowid, operation) VALUES (new.id, new.operation);
+    UPDATE math_operation_counts SET count = count - 1 WHERE operation = old.operation;
+    INSERT INTO math_operation_counts (operation, count) VALUES (new.operation, 1)
+        ON CONFLICT (operation) DO UPDATE SET count = count + 1;
+END;
+"""
+
+Row = Tuple[int, float, str, str]
+
+
+class MathHistory:
+    """
+    Indexed, paginated history of evaluated math operations stored in `math_operations`.
+
+    Operations are full-text indexed with FTS5, time-range queries are served from a
+    covering index, and per-expression counts are maintained by a trigger so the most
+    frequent expressions never need a table scan. Every query pages with a keyset
+    cursor instead of OFFSET, so later pages are as fast as the first.
+    """
+
+    def __init__(self, db_path: str = "chatbot.db"):
+        """
+        Opens the database and upgrades the `math_operations` schema if needed.
+
+        Args:
+            db_path (str): The SQLite database path. Defaults to "chatbot.db".
+        """
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        """Add the timestamp column, indexes, counts table and FTS index, backfilling existing rows."""
+        conn = self.conn
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS math_operations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            operation TEXT NOT NULL,
+            result TEXT NOT NULL
+        )
+        """)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(math_operations)")]
+        if "created_at" not in columns:
+            conn.execute("ALTER TABLE math_operations ADD COLUMN created_at REAL NOT NULL DEFAULT 0")
+        had_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'math_operations_fts'"
+        ).fetchone()
+        conn.executescript(HISTORY_SCHEMA)
+        if not had_fts:
+            # Index rows written before the history subsystem existed
+            conn.execute("INSERT INTO math_operations_fts (math_operations_fts) VALUES ('rebuild')")
+            conn.execute("DELETE FROM math_operation_counts")
+            conn.execute("""
+            INSERT INTO math_operation_counts (operation, count)
+            SELECT operation, COUNT(*) FROM math_operations GROUP BY operation
+            """)
+        conn.commit()
+
+    def record(self, operation: str, result: str) -> int:
+        """
+        Stores an evaluated operation.
+
+        Args:
+            operation (str): The user's input.
+            result (str): The chatbot's answer.
+
+        Returns:
+            int: The id of the stored row.
+        """
+        cursor = self.conn.execute(
+            "INSERT INTO math_operations (operation, result, created_at) VALUES (?, ?, ?)",
+            (operation, result, time.time())
+        )
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def recent(self, limit: int = 20, before_id: int | None = None) -> List[Row]:
+        """
+        Returns the newest operations, newest first.
+
+        Args:
+            limit (int): The page size. Defaults to 20.
+            before_id (int | None): The cursor; only rows with a smaller id are returned.
+
+        Returns:
+            List[Row]: (id, created_at, operation, result) rows.
+        """
+        return self.conn.execute(
+            "SELECT id, created_at, operation, result FROM math_operations "
+            "WHERE id < ? ORDER BY id DESC LIMIT ?",
+            (before_id if before_id is not None else 2 ** 63 - 1, limit)
+        ).fetchall()
+
+    def search(self, terms: str, limit: int = 20, after_id: int = 0) -> List[Row]:
+        """
+        Full-text searches operations, e.g. for `integrate` or `sqrt`.
+
+        Args:
+            terms (str): The words that must all appear in the operation.
+            limit (int): The page size. Defaults to 20.
+            after_id (int): The cursor; only rows with a larger id are returned.
+
+        Returns:
+            List[Row]: (id, created_at, operation, result) rows, oldest first.
+
+        Raises:
+            ValueError: If no search terms are given.
+        """
+        words = terms.split()
+        if not words:
+            raise ValueError("Please provide search terms.")
+        # Quote every word so user input is never parsed as FTS5 query syntax
+        query = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+        return self.conn.execute(
+            "SELECT m.id, m.created_at, m.operation, m.result "
+            "FROM math_operations_fts f JOIN math_operations m ON m.id = f.rowid "
+            "WHERE math_operations_fts MATCH ? AND f.rowid > ? ORDER BY f.rowid LIMIT ?",
+            (query, after_id, limit)
+        ).fetchall()
+
+    def time_range(self, start: float, end: float, limit: int = 20,
+                   after: Tuple[float, int] | None = None) -> List[Row]:
+        """
+        Returns operations stored within a time range, oldest first.
+
+        Args:
+            start (float): The range start as a Unix timestamp (inclusive).
+            end (float): The range end as a Unix timestamp (exclusive).
+            limit (int): The page size. Defaults to 20.
+            after (Tuple[float, int] | None): The cursor, the (created_at, id) of the last row seen.
+
+        Returns:
+            List[Row]: (id, created_at, operation, result) rows.
+        """
+        after = after or (start, 0)
+        return self.conn.execute(
+            "SELECT id, created_at, operation, result FROM math_operations "
+            "WHERE (created_at, id) > (?, ?) AND created_at >= ? AND created_at < ? "
+            "ORDER BY created_at, id LIMIT ?",
+            (after[0], after[1], start, end, limit)
+        ).fetchall()
+
+    def most_frequent(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        Returns the most frequently evaluated operations.
+
+        Args:
+            limit (int): The number of operations to return. Defaults to 10.
+
+        Returns:
+            List[Tuple[str, int]]: (operation, count) pairs, most frequent first.
+        """
+        return self.conn.execute(
+            "SELECT operation, count FROM math_operation_counts WHERE count > 0 "
+            "ORDER BY count DESC, operation LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+    def iter_search(self, terms: str, page_size: int = 1000) -> Iterator[Row]:
+        """Streams every match of a search, one page at a time."""
+        after_id = 0
+        while True:
+            rows = self.search(terms, page_size, after_id)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            after_id = rows[-1][0]
+
+    @staticmethod
+    def parse_time(value: str) -> float:
+        """
+        Parses an ISO-8601 date/time or a Unix timestamp.
+
+        Raises:
+            ValueError: If the value is neither.
+        """
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.fromisoformat(value).timestamp()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# Test for history.py
+if __name__ == "__main__":
+    print("Testing history.py...")
+    history = MathHistory(":memory:")
+    operations = ["integrate(x^2, x)", "sqrt(56)", "5 * 6", "d/dx(sin(x))"]
+    start = time.time()
+    with history.conn:
+        history.conn.executemany(
+            "INSERT INTO math_operations (operation, result, created_at) VALUES (?, 'ok', ?)",
+            ((operations[i % len(operations)], start + i) for i in range(100_000))
+        )
+    history.record("sqrt(16) + sqrt(9)", "Bot: The result is 7.0.")
+
+    begin = time.perf_counter()
+    first_page = history.search("sqrt", limit=5)
+    print(f"First search page in {(time.perf_counter() - begin) * 1000:.2f} ms:", first_page)
+    second_page = history.search("sqrt", limit=5, after_id=first_page[-1][0])
+    assert second_page[0][0] > first_page[-1][0]
+    assert sum(1 for _ in history.iter_search("integrate")) == 25_000
+
+    begin = time.perf_counter()
+    top = history.most_frequent(3)
+    print(f"Most frequent in {(time.perf_counter() - begin) * 1000:.2f} ms:", top)
+    assert top[0][1] == 25_000
+
+    page = history.time_range(start + 10, start + 20, limit=4)
+    assert [row[0] for row in page] == [11, 12, 13, 14]
+    page = history.time_range(start + 10, start + 20, limit=4, after=(page[-1][1], page[-1][0]))
+    assert [row[0] for row in page] == [15, 16, 17, 18]
+    plan = history.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id, created_at, operation, result FROM math_operations "
+        "WHERE created_at >= 0 AND created_at < 1 ORDER BY created_at, id"
+    ).fetchall()
+    assert "COVERING INDEX" in str(plan)
+    print("Recent:", history.recent(2))
+    # Editing an operation moves it in the full-text index and the counts
+    with history.conn:
+        history.conn.execute("UPDATE math_operations SET operation = 'cbrt(27)' WHERE id = 2")
+    assert [row[0] for row in history.search("cbrt")] == [2] and 2 not in [row[0] for row in history.search("sqrt")]
+    assert dict(history.most_frequent(5))["sqrt(56)"] == 24_999
+    history.close()
+    print("All tests passed!")
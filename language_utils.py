@@ -1,7 +1,11 @@
 import re
 import math
+from types import CodeType
 from typing import Dict
 
+from constant_folding import RADIANS_BY_DEGREE, fold_constants
+from big_integers import guarded_math
+
 
 class LanguageUtils:
     """
@@ -72,8 +76,11 @@ class LanguageUtils:
                 raise ValueError(
                     f"Angle value '{angle_value}' cannot be converted to a float."
                 )
-            print(f"Converted '{angle}' to radians: {math.radians(angle_value)}")
-            return math.radians(angle_value)
+            radians = RADIANS_BY_DEGREE.get(angle_value)  # Precomputed for common angles
+            if radians is None:
+                radians = math.radians(angle_value)
+            print(f"Converted '{angle}' to radians: {radians}")
+            return radians
         else:
             try:
                 angle_value = float(angle)
@@ -175,14 +182,17 @@ class LanguageUtils:
                 raise ValueError(
                     "Empty math expression after conversion. Check the input for unsupported phrases."
                 )
-            # Check if the expression is valid
+            # Check if the expression is valid; folding guards huge powers
             try:
-                eval(
-                    text,
-                    {"__builtins__": None},
-                    {"sqrt": math.sqrt, "log": math.log, "sin": math.sin,
-                     "cos": math.cos, "tan": math.tan, "math": math, "abs": abs}
-                )
+                compiled = fold_constants(text, {})
+                if isinstance(compiled, CodeType):
+                    eval(
+                        compiled,
+                        {"__builtins__": None},
+                        {"sqrt": math.sqrt, "log": math.log, "sin": math.sin,
+                         "cos": math.cos, "tan": math.tan, "math": guarded_math, "abs": abs,
+                         "factorial": guarded_math.factorial}
+                    )
             except Exception as e:
                 raise ValueError(
                     f"Invalid math expression after conversion: '{text}'. Error: {e}"
@@ -266,4 +276,8 @@ if __name__ == "__main__":
         math.radians(45)
     )
     assert math.isclose(language_utils.convert_to_radians("1.57"), 1.57)
+    # Common angles fold to exact values once converted
+    from math_utils import MathUtils
+    expression = language_utils.convert_to_math("What is the cosine of 60 degrees?")
+    assert MathUtils()._parse_and_evaluate_expression(expression) == 0.5
     print("All tests passed!")
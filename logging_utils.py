@@ -1,23 +1,129 @@
 # logging_utils.py
+import os
+import time
+import queue
+import atexit
 import logging
+import logging.handlers
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
+_listener: logging.handlers.QueueListener | None = None
+_handlers: list = []
 
-    def log_error(error_message):
-        logging.error(error_message)
 
-    def log_info(info_message):
-        logging.info(info_message)
+def setup_logging(level: int = logging.INFO, handlers: list | None = None):
+    """
+    Route all log records through a queue to a background writer thread.
+
+    The record is still formatted on the calling thread (`QueueHandler.prepare`
+    merges the message and its arguments before enqueueing); only the handler I/O
+    happens on the listener thread. Calling this again only changes the level.
+
+    Args:
+        level (int): The root logger level. Defaults to logging.INFO.
+        handlers (list | None): The handlers the writer thread emits to.
+            Defaults to a stderr stream handler.
+
+    Returns:
+        Tuple[Callable, Callable]: The log_info and log_error functions.
+    """
+    global _listener, _handlers
+    root = logging.getLogger()
+    if _listener is None:
+        if not handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            handlers = [handler]
+        _handlers = list(handlers)
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        atexit.register(shutdown_logging)
+    root.setLevel(level)
+
+    def log_error(error_message, *args):
+        logging.error(error_message, *args)
+
+    def log_info(info_message, *args):
+        logging.info(info_message, *args)
 
     # Return the logging functions so they can be used outside
     return log_info, log_error
 
 
+def _restart_after_fork() -> None:
+    """Give a forked child its own writer thread; the parent's is not copied by fork."""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    _listener = None
+    setup_logging(root.level, _handlers)
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    _listener = None
+
+
+class RateLimitedLogger:
+    """
+    Wraps a logger so that a frequent message is emitted at most once per interval.
+
+    Disabled levels return before any work is done, and suppressed calls are
+    counted and reported with the next emitted message. Meant for per-step
+    messages in hot loops; use one instance per message, since the suppressed
+    count is reported with whatever message is emitted next.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 1.0):
+        """
+        Args:
+            logger (logging.Logger): The logger to emit to.
+            interval (float): The minimum number of seconds between emitted messages. Defaults to 1.0.
+        """
+        self.logger = logger
+        self.interval = interval
+        self._last_emit = float('-inf')
+        self._suppressed = 0
+
+    def log(self, level: int, msg: str, *args) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self._last_emit < self.interval:
+            self._suppressed += 1
+            return
+        self._last_emit = now
+        if self._suppressed:
+            msg += " (%d similar messages suppressed)"
+            args += (self._suppressed,)
+            self._suppressed = 0
+        self.logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args) -> None:
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args) -> None:
+        self.log(logging.INFO, msg, *args)
+
+
 # Test for logging_utils.py
 if __name__ == "__main__":
     print("Testing logging_utils.py...")
@@ -25,4 +131,10 @@ if __name__ == "__main__":
     # Test logging functions
     log_info("This is an info message.")
     log_error("This is an error message.")
+    # Test rate-limited logging: only the first of many rapid messages is emitted
+    sampled = RateLimitedLogger(logging.getLogger(__name__), interval=60.0)
+    for step in range(1000):
+        sampled.info("Step %d completed.", step)
+    assert sampled._suppressed == 999
+    shutdown_logging()
     print("All tests passed! Check the logs above.")
@@ -1,9 +1,179 @@
 # math_utils.py
 import re
+import ast
 import math
+import operator
+import os
+from collections import deque
+import threading
+import multiprocessing as mp
+from types import CodeType
+from functools import lru_cache
+from typing import Callable, Dict, List, Set, Tuple
 import numpy as np
 import sympy as sp
+from sympy.parsing.sympy_parser import (
+    parse_expr, standard_transformations, implicit_multiplication_application
+)
 from math_validate import MathValidate
+from single_flight import SingleFlight
+from constant_folding import EXACT_TRIG, RADIANS_BY_DEGREE, ConstantFolder, fold_constants
+from big_integers import factorials, guarded_math, guarded_pow
+from safe_paths import resolve_in_directory
+
+# Identical heavy requests in flight across all MathUtils instances share one computation
+heavy_requests = SingleFlight()
+
+# Answers of evaluate_calculus and evaluate_linear_algebra that carry a result; any other answer,
+# e.g. "Invalid calculus expression." or "Definite integral could not be evaluated ...", is a failure
+RESULT_PREFIXES = ("Derivative: ", "Integral: ", "Definite integral: ", "Determinant: ", "Inverse: ")
+
+# Arithmetic of script nodes, matching what eval does for the same operators after folding
+_SCRIPT_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.Pow: guarded_pow, ast.Mod: operator.mod, ast.FloorDiv: operator.floordiv,
+    ast.USub: operator.neg, ast.UAdd: operator.pos,
+}
+
+# 20-point Gauss-Legendre nodes and weights on [-1, 1]
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(20)
+
+
+def _split_arguments(text: str) -> List[str]:
+    """Splits a comma-separated argument list, ignoring commas inside brackets."""
+    args, depth, current = [], 0, ''
+    for char in text:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if char == ',' and depth == 0:
+            args.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        args.append(current.strip())
+    return args
+
+
+def _integrate_in_child(conn, expr: sp.Expr, limits: tuple) -> None:
+    """Child process entry point: runs one SymPy integration and sends back the outcome."""
+    try:
+        conn.send(("ok", sp.integrate(expr, limits)))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+class _SymbolicIntegration:
+    """
+    A SymPy integration running in a forked child process.
+
+    Forking reuses the parent's imported SymPy, so starting is cheap, and a race
+    that is lost or times out is ended by terminating the child instead of leaving
+    a thread competing for the GIL. At most `max_workers` children run at once.
+    """
+
+    max_workers = max(1, (os.cpu_count() or 1) // 2)
+    _slots = threading.BoundedSemaphore(max_workers)
+
+    def __init__(self, conn, process):
+        self._conn = conn
+        self._process = process
+
+    @classmethod
+    def start(cls, expr: sp.Expr, limits: tuple) -> "_SymbolicIntegration | None":
+        """Starts an integration, or returns None if every worker slot is busy."""
+        if not cls._slots.acquire(blocking=False):
+            return None
+        try:
+            context = mp.get_context("fork")
+            parent_conn, child_conn = context.Pipe(duplex=False)
+            process = context.Process(target=_integrate_in_child, args=(child_conn, expr, limits), daemon=True)
+            process.start()
+            child_conn.close()
+        except Exception:
+            cls._slots.release()
+            raise
+        return cls(parent_conn, process)
+
+    def done(self) -> bool:
+        return self._conn.poll()
+
+    def result(self, timeout: float) -> sp.Expr:
+        """
+        Waits for the integral.
+
+        Raises:
+            TimeoutError: If SymPy does not finish in time.
+            ValueError: If SymPy fails.
+        """
+        if not self._conn.poll(timeout):
+            raise TimeoutError()
+        try:
+            status, payload = self._conn.recv()
+        except EOFError:
+            raise ValueError("the integration process exited unexpectedly")
+        if status == "error":
+            raise ValueError(payload)
+        return payload
+
+    def cancel(self) -> None:
+        """Terminates the child if it is still running and frees its slot."""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+        self._conn.close()
+        self._process = None
+        self._slots.release()
+
+
+def _gauss_legendre(f: Callable[[np.ndarray], np.ndarray], a: float, b: float) -> float:
+    """Integrates f over [a, b] with one vectorized 20-point Gauss-Legendre rule."""
+    half, mid = (b - a) / 2, (b + a) / 2
+    values = np.broadcast_to(f(half * _GL_NODES + mid), _GL_NODES.shape)
+    return half * float(np.dot(_GL_WEIGHTS, values))
+
+
+def adaptive_quadrature(f: Callable[[np.ndarray], np.ndarray], a: float, b: float,
+                        tol: float = 1e-10, max_intervals: int = 2000) -> Tuple[float, float, bool]:
+    """
+    Integrates f over [a, b] with adaptive Gauss-Legendre quadrature.
+
+    Each interval's estimate is compared against the sum over its two halves and
+    bisected until they agree within the tolerance.
+
+    Args:
+        f (Callable): A vectorized integrand accepting a NumPy array.
+        a (float): The lower bound.
+        b (float): The upper bound.
+        tol (float): The absolute error tolerance. Defaults to 1e-10.
+        max_intervals (int): The maximum number of bisections. Defaults to 2000.
+
+    Returns:
+        Tuple[float, float, bool]: The integral, its error estimate and whether it
+        converged: the estimate is within the tolerance and the bisection cap was not hit.
+    """
+    total, error, intervals = 0.0, 0.0, 0
+    pending = [(a, b, _gauss_legendre(f, a, b), tol)]
+    while pending:
+        lo, hi, whole, interval_tol = pending.pop()
+        mid = (lo + hi) / 2
+        left, right = _gauss_legendre(f, lo, mid), _gauss_legendre(f, mid, hi)
+        estimate = abs(left + right - whole)
+        intervals += 1
+        if estimate <= interval_tol or intervals >= max_intervals:
+            total += left + right
+            error += estimate
+        else:
+            pending.append((lo, mid, left, interval_tol / 2))
+            pending.append((mid, hi, right, interval_tol / 2))
+    converged = intervals < max_intervals and error <= tol
+    return total, error, converged
 
 
 class MathUtils:
@@ -27,33 +197,288 @@ class MathUtils:
             'tan': math.tan,
             'pi': math.pi,
             'e': math.e,
-            'factorial': math.factorial,
+            'factorial': factorials,  # Cached, and approximated for huge results
             'abs': abs,
             'exp': math.exp,
             'radians': math.radians
         }
         self.supported_operations = ['+', '-', '*', '/', '^']
+        self.matrix_file_pattern = re.compile(
+            r'^\s*(det|inv)\s*\(?\s*@(\S+?)\s*\)?(?:\s+out\s*=\s*@(\S+))?\s*$'
+        )
+        self.matrix_print_limit = 100  # Larger results are summarized instead of printed
+        self.matrix_dir = os.path.abspath("matrices")  # `@file.npy` paths are resolved inside this directory
+        self.integration_deadline = 2.0  # Seconds to wait for a definite integral
+        self.integration_tolerance = 1e-10  # Absolute error tolerance of numeric quadrature
+        self.formulas: Dict[str, str] = {}  # Formula name -> source expression
+        self._compiled_formulas = {}  # Formula name -> compiled code object
+        self.dependencies: Dict[str, Set[str]] = {}  # Formula name -> names it reads
+        self.dependents: Dict[str, Set[str]] = {}  # Name -> formulas that read it
         self.math_validate = MathValidate(
             self.supported_functions,
             self.supported_operations,
             self.variables
         )
+        self._function_name_pattern = re.compile(
+            r'(?<![\w.])(' + '|'.join(sorted(map(re.escape, self.supported_functions), key=len, reverse=True)) + r')\b'
+        )
+        # Repeated expressions skip rewriting and parsing; constant ones are a single lookup
+        self._compile_expression = lru_cache(maxsize=1024)(self._compile_expression)
 
-    def set_variable(self, var_name: str, var_value: float) -> None:
+    def set_variable(self, var_name: str, var_value: float) -> List[str]:
         """
-        Sets a variable to a specific value.
+        Sets a variable to a specific value and recomputes the formulas that depend on it.
 
         Args:
             var_name (str): The name of the variable.
             var_value (float): The value of the variable.
 
+        Returns:
+            List[str]: The names of the recomputed formulas, in evaluation order.
+
         Raises:
             ValueError: If the variable name is invalid.
         """
         error = self.math_validate.validate_variable_name(var_name)
         if error:
             raise ValueError(error)
+        self._remove_formula(var_name)
         self.variables[var_name] = var_value
+        return self._recompute(var_name)
+
+    def set_formula(self, var_name: str, expression: str) -> List[str]:
+        """
+        Defines a named formula over other variables, e.g. `y = x * 2 + sqrt(z)`.
+
+        The formula is parsed and compiled once. Its value is cached in the variables
+        and only recomputed when one of the names it depends on changes.
+
+        Args:
+            var_name (str): The name of the formula.
+            expression (str): The formula's math expression.
+
+        Returns:
+            List[str]: The names of the recomputed formulas, starting with this one.
+
+        Raises:
+            ValueError: If the name or expression is invalid or creates a circular dependency.
+        """
+        error = self.math_validate.validate_variable_name(var_name)
+        if error:
+            raise ValueError(error)
+        code, names = self._compile_formula(expression)
+        if var_name in names or var_name in self._downstream(names & self.formulas.keys(), upstream=True):
+            raise ValueError(f"Circular dependency: formula '{var_name}' depends on itself.")
+        self._remove_formula(var_name)
+        self.formulas[var_name] = expression
+        self._compiled_formulas[var_name] = code
+        self.dependencies[var_name] = names
+        for name in names:
+            self.dependents.setdefault(name, set()).add(var_name)
+        self._evaluate_formula(var_name)
+        return [var_name] + self._recompute(var_name)
+
+    def _compile_formula(self, expression: str):
+        """
+        Parses a formula into a compiled code object and the set of names it reads.
+
+        Raises:
+            ValueError: If the expression is not valid math or calls unsupported functions.
+        """
+        source = expression.replace('^', '**')
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError:
+            raise ValueError(f"Invalid formula: '{expression}'.")
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or not callable(self.supported_functions.get(node.func.id)):
+                    raise ValueError(f"Unsupported function in formula: '{expression}'.")
+            elif isinstance(node, ast.Name):
+                if node.id not in self.supported_functions:
+                    names.add(node.id)
+            elif isinstance(node, ast.Constant):
+                # Numbers only: strings, bytes, booleans, None and complex literals are not math
+                if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+                    raise ValueError(f"Unsupported constant in formula: '{expression}'.")
+            elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp,
+                                       ast.operator, ast.unaryop, ast.Load)):
+                raise ValueError(f"Unsupported syntax in formula: '{expression}'.")
+        tree = ConstantFolder({}).visit(tree)  # Guards powers
+        return compile(ast.fix_missing_locations(tree), '<formula>', 'eval'), names
+
+    def _remove_formula(self, var_name: str) -> None:
+        """Drops a formula definition while keeping the formulas that depend on its name."""
+        if var_name not in self.formulas:
+            return
+        for name in self.dependencies.pop(var_name):
+            self.dependents[name].discard(var_name)
+        del self.formulas[var_name]
+        del self._compiled_formulas[var_name]
+
+    def _downstream(self, names: Set[str], upstream: bool = False) -> Set[str]:
+        """Returns every formula reachable from the given names (or feeding them, if upstream)."""
+        edges = self.dependencies if upstream else self.dependents
+        seen = set()
+        pending = deque(names)
+        while pending:
+            for name in edges.get(pending.popleft(), ()):
+                if name not in seen:
+                    seen.add(name)
+                    pending.append(name)
+        return seen
+
+    def _evaluate_formula(self, var_name: str) -> None:
+        """Evaluates one formula from the cached values; undefined results drop the value."""
+        try:
+            self.variables[var_name] = eval(
+                self._compiled_formulas[var_name],
+                {"__builtins__": None},
+                {**self.supported_functions, **self.variables, "math": guarded_math}
+            )
+        except Exception:
+            self.variables.pop(var_name, None)
+
+    def _recompute(self, changed: str) -> List[str]:
+        """
+        Recomputes only the formulas downstream of a changed name, in topological order.
+
+        Returns:
+            List[str]: The names of the recomputed formulas, in evaluation order.
+        """
+        dirty = self._downstream({changed})
+        pending_inputs = {
+            name: len(self.dependencies[name] & dirty) for name in dirty
+        }
+        ready = deque(sorted(name for name, count in pending_inputs.items() if count == 0))
+        order = []
+        while ready:
+            name = ready.popleft()
+            self._evaluate_formula(name)
+            order.append(name)
+            for dependent in sorted(self.dependents.get(name, ())):
+                pending_inputs[dependent] -= 1
+                if pending_inputs[dependent] == 0:
+                    ready.append(dependent)
+        return order
+
+    def evaluate_script(self, script: str) -> Tuple[List[Tuple[str, float | None, str | None]], int, int]:
+        """
+        Evaluates several statements at once, e.g. `x = 3; y = 4; sqrt(x^2 + y^2) * 2`.
+
+        Statements are separated by `;` or newlines. They are parsed together into one
+        DAG in which structurally identical subexpressions, across all statements,
+        share a node, and every node is evaluated once. A name refers to the latest
+        assignment in the script, otherwise to the stored variable; stored formulas
+        that read a name assigned earlier in the script are expanded inline. Script
+        assignments bind the computed value, like `x = 3`, and are stored in order
+        once the script has been evaluated.
+
+        Args:
+            script (str): The statements.
+
+        Returns:
+            Tuple[List[Tuple[str, float | None, str | None]], int, int]: Per statement its
+            source, its value and its error (one of the two is None), then the number
+            of unique nodes evaluated and the number of subexpressions parsed.
+        """
+        nodes: List[tuple] = []  # (operation, *argument node ids); children come first
+        node_ids: Dict[tuple, int] = {}
+        parsed = 0
+        bindings: Dict[str, int] = {}  # Name -> node of its latest assignment in the script
+
+        def intern(key: tuple) -> int:
+            nonlocal parsed
+            parsed += 1
+            if key not in node_ids:
+                node_ids[key] = len(nodes)
+                nodes.append(key)
+            return node_ids[key]
+
+        def build(node: ast.AST) -> int:
+            if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+                return intern(("const", repr(node.value), node.value))
+            if isinstance(node, ast.Name):
+                return resolve(node.id)
+            if isinstance(node, ast.BinOp) and type(node.op) in _SCRIPT_OPERATORS:
+                return intern((type(node.op), build(node.left), build(node.right)))
+            if isinstance(node, ast.UnaryOp) and type(node.op) in _SCRIPT_OPERATORS:
+                return intern((type(node.op), build(node.operand)))
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords
+                    and callable(self.supported_functions.get(node.func.id))):
+                return intern((node.func.id, *(build(arg) for arg in node.args)))
+            raise ValueError(f"Unsupported syntax: '{ast.unparse(node)}'.")
+
+        def resolve(name: str) -> int:
+            if name in bindings:
+                return bindings[name]
+            if name in self.supported_functions and not callable(self.supported_functions[name]):
+                return intern(("const", name, self.supported_functions[name]))
+            if name in self.formulas and self._downstream(set(bindings)) & {name}:
+                return build(ast.parse(self.formulas[name].replace('^', '**'), mode='eval').body)
+            return intern(("name", name))
+
+        statements = []
+        for source in filter(None, (part.strip() for part in re.split(r'[;\n]', script))):
+            var_name, expression = None, source
+            if re.match(r'^[A-Za-z_]\w*\s*=[^=]', source):
+                var_name, expression = (part.strip() for part in source.split('=', 1))
+            try:
+                error = self.math_validate.validate_variable_name(var_name) if var_name else None
+                if error:
+                    raise ValueError(error)
+                try:
+                    tree = ast.parse(expression.replace('^', '**'), mode='eval')
+                except SyntaxError:
+                    raise ValueError("Invalid math expression. Please check your input.")
+                if var_name and isinstance(tree.body, ast.Constant) and isinstance(tree.body.value, (int, float)):
+                    value = float(tree.body.value)  # Numbers are stored as floats, as in `x = 3`
+                    node_id = intern(("const", repr(value), value))
+                else:
+                    node_id = build(tree.body)
+            except ValueError as e:
+                statements.append((source, var_name, None, str(e)))
+                continue
+            if var_name:
+                bindings[var_name] = node_id
+            statements.append((source, var_name, node_id, None))
+
+        values: List[float | None] = []
+        errors: List[str | None] = []
+        for operation, *arguments in nodes:
+            value = error = None
+            if operation == "const":
+                value = arguments[1]
+            elif operation == "name":
+                if arguments[0] in self.variables:
+                    value = self.variables[arguments[0]]
+                else:
+                    error = f"Undefined variable '{arguments[0]}'. Please assign a value to it first."
+            elif any(errors[a] for a in arguments):
+                error = next(errors[a] for a in arguments if errors[a])
+            elif len(arguments) == 1 and (operation, values[arguments[0]]) in EXACT_TRIG:
+                value = EXACT_TRIG[operation, values[arguments[0]]]  # Common angles, as in single expressions
+            else:
+                function = _SCRIPT_OPERATORS.get(operation) or self.supported_functions[operation]
+                try:
+                    value = function(*(values[a] for a in arguments))
+                except ZeroDivisionError:
+                    error = "Division by zero is not allowed."
+                except (ValueError, TypeError, OverflowError) as e:
+                    error = f"Error evaluating math expression: {e}"
+            values.append(value)
+            errors.append(error)
+
+        results = []
+        for source, var_name, node_id, error in statements:
+            if node_id is not None:
+                error = errors[node_id]
+            value = None if error or node_id is None else values[node_id]
+            if var_name and error is None:
+                self.set_variable(var_name, value)
+            results.append((source, value, error))
+        return results, len(nodes), parsed
 
     def get_variables(self) -> dict:
         """
@@ -64,6 +489,47 @@ class MathUtils:
         """
         return self.variables
 
+    def _compile_expression(self, expression: str):
+        """
+        Rewrites an expression into Python and folds its constant subtrees.
+
+        Args:
+            expression (str): The math expression to compile.
+
+        Returns:
+            The value of a constant expression, otherwise a compiled code object.
+
+        Raises:
+            SyntaxError: If the input expression is syntactically incorrect.
+        """
+        # Replace natural language terms with math operations
+        expression = expression.lower()
+        expression = expression.replace("plus", "+")
+        expression = expression.replace("minus", "-")
+        expression = expression.replace("times", "*")
+        expression = expression.replace("divided by", "/")
+        expression = expression.replace("to the power of", "^")
+        expression = expression.replace("power", "^")
+
+        # Handle degree-based trigonometric functions; common angles fold to exact values
+        trig_funcs = ['sin', 'cos', 'tan']
+        for func in trig_funcs:
+            pattern = rf"{func}\s*of\s*(\d+)\s*degrees"
+            match = re.search(pattern, expression)
+            if match:
+                value_in_degrees = float(match.group(1))
+                value_in_radians = RADIANS_BY_DEGREE.get(value_in_degrees)
+                if value_in_radians is None:
+                    value_in_radians = math.radians(value_in_degrees)
+                expression = expression.replace(
+                    match.group(0), f"{func}({value_in_radians!r})"
+                )
+
+        # Replace supported functions and constants, leaving `math.<name>` and longer names alone
+        expression = self._function_name_pattern.sub(r'math.\1', expression)
+        expression = expression.replace('^', '**')
+        return fold_constants(expression, self.supported_functions)
+
     def _parse_and_evaluate_expression(self, expression: str) -> float:
         """
         Replaces supported functions and constants, then evaluates the expression.
@@ -80,37 +546,15 @@ class MathUtils:
             SyntaxError: If the input expression is syntactically incorrect.
         """
         try:
-            # Replace natural language terms with math operations
-            expression = expression.lower()
-            expression = expression.replace("plus", "+")
-            expression = expression.replace("minus", "-")
-            expression = expression.replace("times", "*")
-            expression = expression.replace("divided by", "/")
-            expression = expression.replace("to the power of", "^")
-            expression = expression.replace("power", "^")
-
-            # Handle degree-based trigonometric functions
-            trig_funcs = ['sin', 'cos', 'tan']
-            for func in trig_funcs:
-                pattern = rf"{func}\s*of\s*(\d+)\s*degrees"
-                match = re.search(pattern, expression)
-                if match:
-                    value_in_degrees = float(match.group(1))
-                    value_in_radians = math.radians(value_in_degrees)
-                    expression = expression.replace(
-                        match.group(0), f"{func}({value_in_radians})"
-                    )
-
-            # Replace supported functions and constants
-            for func, value in self.supported_functions.items():
-                expression = expression.replace(func, f'math.{func}')
-            expression = expression.replace('^', '**')
+            compiled = self._compile_expression(expression)
+            if not isinstance(compiled, CodeType):
+                return compiled  # Folded at compile time
 
             # Evaluate the expression
             result = eval(
-                expression,
+                compiled,
                 {"__builtins__": None},
-                {"math": math, **self.variables}
+                {"math": guarded_math, **self.variables}
             )
             return result
         except ZeroDivisionError:
@@ -149,12 +593,24 @@ class MathUtils:
         """
         Evaluates calculus expressions (derivatives and integrals) using SymPy.
 
+        Concurrent identical requests (ignoring whitespace) are computed once.
+
         Args:
             expression (str): The calculus expression to evaluate.
 
         Returns:
             str: The result of the calculus operation.
         """
+        key = ("calculus", self._normalize_request(expression))
+        return heavy_requests.do(key, self._evaluate_calculus, expression)
+
+    @staticmethod
+    def _normalize_request(expression: str) -> str:
+        """Normalizes a heavy request so equivalent spellings coalesce."""
+        return re.sub(r'\s+', '', expression).replace('**', '^')
+
+    def _evaluate_calculus(self, expression: str) -> str:
+        """Evaluates a calculus expression; see `evaluate_calculus`."""
         try:
             x = sp.symbols('x')
             expression = expression.replace('^', '**')  # Replace ^ with ** for SymPy
@@ -169,12 +625,20 @@ class MathUtils:
                 return f"Derivative: {derivative}"
 
             elif 'integrate' in expression:
-                # Extract the expression to integrate
-                expr = expression.replace('integrate', '').strip()
-                # Ensure the expression is compatible with SymPy
-                expr = expr.replace(' ', '')  # Remove spaces
-                expr = sp.sympify(expr)  # Parse the expression
-                integral = sp.integrate(expr, x)
+                # Extract the integrand, variable and optional bounds
+                args = expression.replace('integrate', '').strip()
+                if args.startswith('(') and args.endswith(')'):
+                    args = args[1:-1]
+                args = _split_arguments(args)
+                if len(args) == 2 and args[1].startswith('('):
+                    args = args[:1] + _split_arguments(args[1][1:-1])  # integrate(f, (x, a, b))
+                expr = self._parse_sympy(args[0])
+                var = self._parse_sympy(args[1]) if len(args) > 1 else x
+                if len(args) == 4:
+                    return self._integrate_definite(expr, var, self._parse_sympy(args[2]), self._parse_sympy(args[3]))
+                if len(args) > 2:
+                    return "Invalid integral. Use integrate(f, x) or integrate(f, x, a, b)."
+                integral = sp.integrate(expr, var)
                 return f"Integral: {integral}"
 
             else:
@@ -182,17 +646,86 @@ class MathUtils:
         except Exception as e:
             return f"Error evaluating calculus expression: {e}"
 
+    @staticmethod
+    def _parse_sympy(text: str) -> sp.Expr:
+        """Parses a SymPy expression, allowing implicit multiplication such as `3x`."""
+        return parse_expr(text, transformations=standard_transformations + (implicit_multiplication_application,))
+
+    def _integrate_definite(self, expr: sp.Expr, var: sp.Symbol, lower: sp.Expr, upper: sp.Expr) -> str:
+        """
+        Races symbolic integration against numeric quadrature for a definite integral.
+
+        SymPy starts in a child process while the vectorized quadrature runs in the
+        caller. A converged numeric result answers unless SymPy has already finished;
+        it is also the fallback when SymPy fails or finds no closed form. If neither
+        succeeds within `integration_deadline` seconds the request gives up. The
+        SymPy process is terminated as soon as it is no longer needed.
+
+        Returns:
+            str: The integral, the method that answered and its error estimate.
+        """
+        symbolic = _SymbolicIntegration.start(expr, (var, lower, upper))
+        try:
+            numeric = None
+            if not expr.free_symbols - {var} and lower.is_finite and upper.is_finite:
+                try:
+                    integrand = sp.lambdify(var, expr, modules='numpy')
+                    with np.errstate(all='ignore'):
+                        value, error, converged = adaptive_quadrature(
+                            integrand, float(lower), float(upper), self.integration_tolerance
+                        )
+                    if converged and np.isfinite(value):
+                        numeric = f"Definite integral: {value} (numeric Gauss-Legendre, error estimate {error:.2e})"
+                except Exception:
+                    numeric = None
+            if numeric is not None and (symbolic is None or not symbolic.done()):
+                return numeric
+            if symbolic is None:
+                return "Definite integral could not be evaluated: the server is busy, please retry later."
+            try:
+                integral = symbolic.result(timeout=self.integration_deadline)
+            except TimeoutError:
+                return f"Definite integral could not be evaluated within {self.integration_deadline} seconds."
+            except ValueError:
+                if numeric is not None:
+                    return numeric
+                raise
+            if integral.has(sp.Integral):
+                return numeric or f"Definite integral: {integral} (SymPy found no closed form)"
+            if integral.has(sp.nan, sp.zoo):  # Not a value, e.g. 1/x across its pole
+                return numeric or "Definite integral diverges or is undefined."
+            return f"Definite integral: {integral} (symbolic, exact)"
+        finally:
+            if symbolic is not None:
+                symbolic.cancel()
+
     def evaluate_linear_algebra(self, expression: str) -> str:
         """
         Evaluates linear algebra expressions (matrix operations) using NumPy.
 
+        Matrices are given inline as list literals, e.g. `det([[1, 2], [3, 4]])`, or as
+        `.npy` files in `matrix_dir`, e.g. `det @a.npy` or `inv @a.npy out=@a_inv.npy`. Concurrent
+        identical requests (ignoring whitespace, and for files against the same `matrix_dir`)
+        are computed once.
+
         Args:
             expression (str): The linear algebra expression to evaluate.
 
         Returns:
             str: The result of the linear algebra operation.
         """
+        key = ("linear_algebra", self._normalize_request(expression))
+        if self.matrix_file_pattern.match(expression):
+            # The same file names mean different files for instances with different directories
+            key += (os.path.realpath(self.matrix_dir),)
+        return heavy_requests.do(key, self._evaluate_linear_algebra, expression)
+
+    def _evaluate_linear_algebra(self, expression: str) -> str:
+        """Evaluates a linear algebra expression; see `evaluate_linear_algebra`."""
         try:
+            file_match = self.matrix_file_pattern.match(expression)
+            if file_match:
+                return self._evaluate_matrix_file(*file_match.groups())
             if 'det' in expression:
                 matrix = eval(expression.replace('det', ''))
                 determinant = np.linalg.det(matrix)
@@ -206,6 +739,63 @@ class MathUtils:
         except Exception as e:
             return f"Error evaluating linear algebra expression: {e}"
 
+    def resolve_matrix_path(self, path: str) -> str:
+        """
+        Resolves a `@file.npy` path against `matrix_dir`.
+
+        Args:
+            path (str): The path as given by the user, relative to `matrix_dir`.
+
+        Returns:
+            str: The absolute path of the file.
+
+        Raises:
+            ValueError: If the path is absolute, contains `..`, is not a `.npy` file or leaves
+                `matrix_dir` through a symbolic link.
+        """
+        return resolve_in_directory(self.matrix_dir, path, ('.npy',), "Matrix")
+
+    def _evaluate_matrix_file(self, operation: str, path: str, out_path: str | None) -> str:
+        """
+        Evaluates `det` or `inv` on a memory-mapped `.npy` matrix.
+
+        Args:
+            operation (str): Either "det" or "inv".
+            path (str): The `.npy` file holding the matrix, relative to `matrix_dir`.
+            out_path (str | None): The `.npy` file the result is written to, if any, relative to `matrix_dir`.
+
+        Returns:
+            str: The result, or a summary for matrices too large to print.
+
+        Raises:
+            ValueError: If a path is not allowed (see `resolve_matrix_path`) or the file does not
+                hold a square 2-D matrix.
+        """
+        matrix = np.load(self.resolve_matrix_path(path), mmap_mode='r')
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError(f"'{path}' must hold a square 2-D matrix, got shape {matrix.shape}.")
+        if operation == 'det':
+            # slogdet does not overflow for large matrices the way det does
+            sign, logdet = np.linalg.slogdet(matrix)
+            with np.errstate(over='ignore'):
+                determinant = sign * np.exp(logdet)
+            if out_path:
+                np.save(self.resolve_matrix_path(out_path), np.array(determinant))
+            if np.isfinite(determinant):
+                return f"Determinant: {determinant}"
+            return f"Determinant: sign {sign}, log|det| {logdet}"
+        inverse = np.linalg.inv(matrix)
+        if out_path:
+            np.save(self.resolve_matrix_path(out_path), inverse)
+            return f"Inverse: {inverse.shape[0]}x{inverse.shape[1]} {inverse.dtype} matrix written to {out_path}"
+        if inverse.size <= self.matrix_print_limit:
+            return f"Inverse: {inverse}"
+        return (
+            f"Inverse: {inverse.shape[0]}x{inverse.shape[1]} {inverse.dtype} matrix "
+            f"(min {inverse.min()}, max {inverse.max()}, mean {inverse.mean()}). "
+            f"Add out=@file.npy to save it."
+        )
+
 
 # Test for math_utils.py
 if __name__ == "__main__":
@@ -216,13 +806,137 @@ if __name__ == "__main__":
     math_utils.set_variable("x", 10)
     print("Variable 'x' set to 10.")
 
+    # Test formulas recompute when their inputs change
+    math_utils.set_variable("z", 16)
+    math_utils.set_formula("y", "x * 2 + sqrt(z)")
+    math_utils.set_formula("w", "y ^ 2")
+    print("Formula 'y':", math_utils.get_variables()["y"])  # 24.0
+    print("Recomputed after 'x = 1':", math_utils.set_variable("x", 1))  # ['y', 'w']
+    assert math_utils.get_variables()["w"] == 36.0
+    assert math_utils.set_variable("x", 10) == ['y', 'w']
+    for bad in ('"ab" * 3', "x * True", "2j * x", "None"):
+        try:
+            math_utils.set_formula("bad", bad)
+            raise AssertionError(f"Expected ValueError for {bad}")
+        except ValueError:
+            pass
+    assert "bad" not in math_utils.formulas
+
+    # Test scripts share common subexpressions across statements
+    results, unique, parsed = math_utils.evaluate_script("a = 3; b = 4\nsqrt(a^2 + b^2) * 2; sqrt(a^2 + b^2) + 1; c / 0")
+    print("Script results:", results, f"({unique} unique of {parsed} subexpressions)")
+    assert [value for _, value, _ in results[:4]] == [3.0, 4.0, 10.0, 6.0] and results[4][1] is None
+    assert unique < parsed and math_utils.get_variables()["b"] == 4
+    results, _, _ = math_utils.evaluate_script("x = 1; w + 1")  # w = (x * 2 + sqrt(z)) ^ 2
+    assert results[1][1] == 37.0
+    results, _, _ = math_utils.evaluate_script("a = 1; sin(pi); cos(pi/2)")  # Exact, as on their own
+    assert [value for _, value, _ in results] == [1.0, 0.0, 0.0]
+    math_utils.set_variable("x", 10)
+
+    # Test constant folding and exact common angles
+    assert math_utils._parse_and_evaluate_expression("sin of 30 degrees") == 0.5
+    assert math_utils._parse_and_evaluate_expression("tan of 45 degrees") == 1.0
+    assert math_utils._parse_and_evaluate_expression("(5 + 3) * 4 + sqrt(16)") == 36.0
+    assert math_utils._parse_and_evaluate_expression("x * sqrt(16)") == 40.0
+    import timeit
+    print(f"Constant request: {timeit.timeit(lambda: math_utils._parse_and_evaluate_expression('(5 + 3) * sqrt(16)'), number=10000) * 100:.2f} us")
+
+    # Test factorials are cached and approximated when huge
+    assert math_utils._parse_and_evaluate_expression("factorial(20) / factorial(18)") == 380.0
+    print("Evaluating 'factorial(1000000)':", math_utils._parse_and_evaluate_expression("factorial(1000000)"))
+    # Integer powers likewise, at compile time, at evaluation time, in scripts and in formulas
+    assert math_utils._parse_and_evaluate_expression("2^100000").digits == 30103
+    print("Evaluating '9^9^9':", math_utils._parse_and_evaluate_expression("9^9^9"))
+    math_utils.set_variable("big", 2)
+    assert math_utils._parse_and_evaluate_expression("big^100000 * 3").digits == 30104
+    results, _, _ = math_utils.evaluate_script("p = 3; 2^100000 * p")
+    assert results[1][1].digits == 30104
+    math_utils.set_formula("huge", "big^100000")
+    assert math_utils.get_variables()["huge"].digits == 30103
+    math_utils.set_formula("huge", "big^10")
+    assert math_utils.get_variables()["huge"] == 1024
+
     # Test evaluate_expression
     print("Evaluating 'x + 5':", math_utils.evaluate_expression("x + 5"))  # 15.0
 
     # Test evaluate_calculus
     print("Evaluating 'd/dx(x^2 + 3x)':", math_utils.evaluate_calculus("d/dx(x^2 + 3x)"))  # Derivative: 2*x + 3
 
+    # Test definite integrals
+    print("Evaluating 'integrate(x^2, x, 0, 1)':", math_utils.evaluate_calculus("integrate(x^2, x, 0, 1)"))  # 1/3
+    print("Evaluating 'integrate(exp(-x^2)*cos(3x), (x, 0, 2))':",
+          math_utils.evaluate_calculus("integrate(exp(-x^2)*cos(3x), (x, 0, 2))"))  # Numeric
+    value, error, converged = adaptive_quadrature(np.sin, 0, math.pi)
+    assert abs(value - 2) < 1e-10 and error < 1e-10 and converged
+    assert not adaptive_quadrature(lambda t: np.log(t) / t, 0, 1)[2]  # Divergent: never accepted
+    for _ in range(3):
+        assert math_utils.evaluate_calculus("integrate(log(x)/x, x, 0, 1)") == "Definite integral: -oo (symbolic, exact)"
+    # The numeric value answers when SymPy fails or finds no closed form
+    real_integrate = sp.integrate
+    sp.integrate = lambda *args: sp.Integral(*args)
+    print("Evaluating 'integrate(x^x, x, 0, 1)' without a closed form:",
+          math_utils.evaluate_calculus("integrate(x^x, x, 0, 1)"))
+    assert "numeric" in math_utils.evaluate_calculus("integrate(x^x, x, 0, 1)")
+    sp.integrate = lambda *args: 1 / 0
+    assert "numeric" in math_utils.evaluate_calculus("integrate(x^x + 1, x, 0, 1)")
+    # A nan or complex infinity from SymPy is not reported as an exact value
+    sp.integrate = lambda *args: sp.nan
+    assert math_utils.evaluate_calculus("integrate(log(x)/x + 1, x, 0, 1)") == "Definite integral diverges or is undefined."
+    sp.integrate = lambda *args: sp.zoo
+    assert "numeric" in math_utils.evaluate_calculus("integrate(x^x + 2, x, 0, 1)")
+    sp.integrate = real_integrate
+    assert math_utils.evaluate_calculus("d/dx(x^3)").startswith(RESULT_PREFIXES)
+    for failure in (math_utils.evaluate_calculus("limit(x)"), math_utils.evaluate_calculus("integrate(x, x, 1)"),
+                    math_utils.evaluate_calculus("d/dx(x^)"), math_utils.evaluate_linear_algebra("trace([[1]])"),
+                    math_utils.evaluate_linear_algebra("det([[1, 2]")):
+        assert not failure.startswith(RESULT_PREFIXES), failure
+    assert "nan" not in math_utils.evaluate_calculus("integrate(1/x, x, -1, 1)")
+    assert threading.active_count() == 1 and not mp.active_children()
+
     # Test evaluate_linear_algebra
     print("Evaluating 'det([[1, 2], [3, 4]])':", math_utils.evaluate_linear_algebra("det([[1, 2], [3, 4]])"))  # Determinant: -2.0
 
+    # Test memory-mapped .npy matrices
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    with tempfile.TemporaryDirectory() as tmp:
+        math_utils.matrix_dir = tmp
+        np.save(os.path.join(tmp, "a.npy"), np.eye(500) * 2)
+        print("Evaluating 'det @a.npy':", math_utils.evaluate_linear_algebra("det @a.npy"))  # Determinant: 3.27e+150
+        print("Evaluating 'inv @a.npy':", math_utils.evaluate_linear_algebra("inv @a.npy"))  # Summary
+        print("Evaluating 'inv @a.npy out=@a_inv.npy':",
+              math_utils.evaluate_linear_algebra("inv @a.npy out=@a_inv.npy"))
+        assert np.allclose(np.load(os.path.join(tmp, "a_inv.npy")), np.eye(500) / 2)
+        # Coalescing does not mix up instances whose matrix directories differ
+        other_utils = MathUtils()
+        other_utils.matrix_dir = os.path.join(tmp, "other")
+        os.mkdir(other_utils.matrix_dir)
+        np.save(os.path.join(other_utils.matrix_dir, "a.npy"), np.diag([1.0, 2.0, 4.0]))
+        started, release = threading.Event(), threading.Event()
+        evaluate = math_utils._evaluate_linear_algebra
+
+        def slow_evaluate(expression):
+            started.set()
+            release.wait()
+            return evaluate(expression)
+        math_utils._evaluate_linear_algebra = slow_evaluate
+        with ThreadPoolExecutor(2) as pool:
+            in_flight = pool.submit(math_utils.evaluate_linear_algebra, "det @a.npy")
+            started.wait()
+            try:  # Joining the in-flight call would wait for the release below
+                other = pool.submit(other_utils.evaluate_linear_algebra, "det @a.npy").result(timeout=10)
+                assert np.isclose(float(other.split()[1]), 8.0)
+            finally:
+                release.set()
+            assert in_flight.result().startswith("Determinant: 3.27")
+        del math_utils._evaluate_linear_algebra
+        # Paths outside the matrix directory are rejected, for reading and for writing
+        os.symlink(os.path.dirname(tmp), os.path.join(tmp, "parent"))
+        for request in (f"det @{os.path.join(tmp, 'a.npy')}", "det @../a.npy", "det @sub/../../a.npy",
+                        "det @parent/a.npy", "inv @a.npy out=@/tmp/escaped.npy", "inv @a.npy out=@../escaped.npy"):
+            result = math_utils.evaluate_linear_algebra(request)
+            assert result.startswith("Error evaluating linear algebra expression"), result
+        assert not os.path.exists("/tmp/escaped.npy") and not os.path.exists(os.path.join(os.path.dirname(tmp), "escaped.npy"))
+
     print("All tests passed!")
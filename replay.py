@@ -0,0 +1,327 @@
+# replay.py
+import os
+import io
+import sys
+import json
+import mmap
+import time
+import zlib
+import queue
+import sqlite3
+import logging
+import contextlib
+import multiprocessing as mp
+from collections import deque
+from typing import Iterator, List, Tuple, Dict
+
+from chatbot import ChatBot
+from logging_utils import setup_logging
+
+logger = logging.getLogger(__name__)
+
+_engine: ChatBot | None = None
+
+
+def read_jsonl(path: str, field: str = "input") -> Iterator[Tuple[int, str]]:
+    """
+    Stream chatbot inputs from a memory-mapped JSONL file.
+
+    Args:
+        path (str): The path of the JSONL file.
+        field (str): The key holding the input text when a line is a JSON object.
+            Lines that are JSON strings are used as-is. Defaults to "input".
+
+    Yields:
+        Tuple[int, str]: The line number and the input text of each non-empty line.
+
+    Raises:
+        ValueError: If a line is not valid JSON or lacks the input field.
+    """
+    for line_number, text, _ in _read_records(path, field):
+        yield line_number, text
+
+
+def _read_records(path: str, field: str = "input",
+                  session_field: str | None = None) -> Iterator[Tuple[int, str, str | None]]:
+    """Like `read_jsonl`, but also yields each record's session (None if it has none)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line_number, line in enumerate(iter(mm.readline, b""), 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    if isinstance(record, str):
+                        text, session = record, None
+                    else:
+                        text = str(record[field])
+                        session = None if session_field is None else record.get(session_field)
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"Invalid replay record on line {line_number}: {e}")
+                yield line_number, text, session
+
+
+def _chunks(records: Iterator[Tuple[int, str]], chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    """Group records into lists of at most chunk_size items."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _rounds(records: Iterator[Tuple[int, str, str | None]], chunk_size: int,
+            engines: int) -> Iterator[List[List[Tuple[int, str]]]]:
+    """Group records into rounds of at most chunk_size inputs, split into one part per engine by session."""
+    parts = [[] for _ in range(engines)]
+    size = 0
+    for line_number, text, session in records:
+        # crc32 rather than hash() so a session maps to the same engine in every run
+        parts[zlib.crc32(str(session).encode()) % engines].append((line_number, text))
+        size += 1
+        if size == chunk_size:
+            yield parts
+            parts = [[] for _ in range(engines)]
+            size = 0
+    if size:
+        yield parts
+
+
+def _init_worker() -> None:
+    """Build one ChatBot engine per worker process and silence its debug prints."""
+    global _engine
+    sys.stdout = open(os.devnull, "w")
+    _engine = ChatBot(run_tests=False)
+
+
+def _respond_chunk(chunk: List[Tuple[int, str]]) -> List[Tuple[int, str, str]]:
+    """Answer every input of a chunk with the worker's engine."""
+    return [(line_number, text, _engine.respond(text)) for line_number, text in chunk]
+
+
+class JsonlWriter:
+    """Writes replay results as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[Tuple[int, str, str]]) -> None:
+        self.file.writelines(
+            json.dumps({"line": line_number, "input": text, "response": response}) + "\n"
+            for line_number, text, response in rows
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class SqliteWriter:
+    """Writes replay results into a `replay_results` table, committing once per chunk."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS replay_results (
+            line INTEGER NOT NULL,
+            input TEXT NOT NULL,
+            response TEXT NOT NULL
+        )
+        """)
+
+    def write(self, rows: List[Tuple[int, str, str]]) -> None:
+        self.conn.executemany("INSERT INTO replay_results VALUES (?, ?, ?)", rows)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class ReplayPipeline:
+    """
+    Replays historical chatbot inputs through a pool of ChatBot engines.
+
+    Inputs are streamed from a memory-mapped JSONL file, dispatched in chunks and
+    written out as they complete. At most `max_in_flight` chunks are pending at
+    any time, so memory stays constant regardless of the input size.
+
+    Engines are stateful (variables, formulas, history). By default chunks go to
+    whichever engine is free, which is only valid for stateless inputs. With a
+    `session_field`, every input of a session is answered by the same engine in
+    input order, so a session's assignments are seen by its later inputs. Sessions
+    pinned to one engine still share its state, as they would on a live chatbot.
+    """
+
+    def __init__(self, workers: int | None = None, chunk_size: int = 256, ordered: bool = True,
+                 max_in_flight: int | None = None, progress_interval: float = 5.0,
+                 session_field: str | None = None):
+        """
+        Initializes the pipeline settings.
+
+        Args:
+            workers (int | None): The number of worker processes. Defaults to the CPU count;
+                0 replays in the current process.
+            chunk_size (int): The number of inputs per dispatched chunk. Defaults to 256.
+            ordered (bool): Write results in input order. Defaults to True.
+            max_in_flight (int | None): The maximum number of pending chunks.
+                Defaults to twice the number of workers.
+            progress_interval (float): Seconds between progress reports. Defaults to 5.0.
+            session_field (str | None): The key holding a record's session id; inputs of one
+                session are pinned to one engine and written in input order. Defaults to None,
+                which load-balances chunks and requires stateless inputs.
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+        self.max_in_flight = max_in_flight or 2 * max(self.workers, 1)
+        self.progress_interval = progress_interval
+        self.session_field = session_field
+
+    def replay(self, input_path: str, output_path: str, field: str = "input") -> Dict[str, float]:
+        """
+        Replay every input of a JSONL file and write the responses.
+
+        Args:
+            input_path (str): The JSONL file to replay.
+            output_path (str): The output file; `.db`/`.sqlite` writes SQLite, anything else JSONL.
+            field (str): The key holding the input text. Defaults to "input".
+
+        Returns:
+            Dict[str, float]: The number of replayed inputs, elapsed seconds and inputs per second.
+        """
+        if output_path.endswith((".db", ".sqlite")):
+            writer = SqliteWriter(output_path)
+        else:
+            writer = JsonlWriter(output_path)
+        records = _read_records(input_path, field, self.session_field)
+        chunks = _chunks(((line_number, text) for line_number, text, _ in records), self.chunk_size)
+        self._count = 0
+        self._start = self._last_report = time.perf_counter()
+        try:
+            if self.workers > 0 and self.session_field is not None:
+                # One single-process pool per engine, so a session's chunks reach the same engine in order
+                with contextlib.ExitStack() as stack:
+                    pools = [stack.enter_context(mp.Pool(1, initializer=_init_worker)) for _ in range(self.workers)]
+                    self._replay_pinned(pools, _rounds(records, self.chunk_size, self.workers), writer)
+            elif self.workers > 0:
+                with mp.Pool(self.workers, initializer=_init_worker) as pool:
+                    self._replay_pool(pool, chunks, writer)
+            else:
+                self._replay_inline(chunks, writer)
+        finally:
+            writer.close()
+        elapsed = time.perf_counter() - self._start
+        stats = {
+            "inputs": self._count,
+            "elapsed": elapsed,
+            "throughput": self._count / elapsed if elapsed else 0.0
+        }
+        logger.info("Replayed %d inputs in %.2fs (%.1f inputs/s).", stats["inputs"], elapsed, stats["throughput"])
+        return stats
+
+    def _replay_inline(self, chunks: Iterator[List[Tuple[int, str]]], writer) -> None:
+        """Answer chunks with a single engine in the current process."""
+        with contextlib.redirect_stdout(io.StringIO()) as silenced:
+            engine = ChatBot(run_tests=False)
+            for chunk in chunks:
+                rows = [(line_number, text, engine.respond(text)) for line_number, text in chunk]
+                silenced.seek(0)
+                silenced.truncate()
+                self._emit(writer, rows)
+
+    def _replay_pool(self, pool, chunks: Iterator[List[Tuple[int, str]]], writer) -> None:
+        """Dispatch chunks to the pool, keeping at most max_in_flight of them pending."""
+        if self.ordered:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_respond_chunk, (chunk,)))
+                if len(pending) >= self.max_in_flight:
+                    self._emit(writer, pending.popleft().get())
+            while pending:
+                self._emit(writer, pending.popleft().get())
+        else:
+            done = queue.Queue()
+            in_flight = 0
+            for chunk in chunks:
+                pool.apply_async(_respond_chunk, (chunk,), callback=done.put, error_callback=done.put)
+                in_flight += 1
+                if in_flight >= self.max_in_flight:
+                    self._emit(writer, self._completed(done))
+                    in_flight -= 1
+            for _ in range(in_flight):
+                self._emit(writer, self._completed(done))
+
+    def _replay_pinned(self, pools: List, rounds: Iterator[List[List[Tuple[int, str]]]], writer) -> None:
+        """Send each round's per-engine parts to their engines and write rounds in input order."""
+        pending = deque()
+        for parts in rounds:
+            pending.append([pools[engine].apply_async(_respond_chunk, (part,))
+                            for engine, part in enumerate(parts) if part])
+            if len(pending) >= self.max_in_flight:
+                self._emit(writer, sorted(row for result in pending.popleft() for row in result.get()))
+        while pending:
+            self._emit(writer, sorted(row for result in pending.popleft() for row in result.get()))
+
+    @staticmethod
+    def _completed(done: queue.Queue) -> List[Tuple[int, str, str]]:
+        """Wait for the next finished chunk, re-raising worker errors."""
+        rows = done.get()
+        if isinstance(rows, BaseException):
+            raise rows
+        return rows
+
+    def _emit(self, writer, rows: List[Tuple[int, str, str]]) -> None:
+        """Write a finished chunk and report progress at most once per interval."""
+        writer.write(rows)
+        self._count += len(rows)
+        now = time.perf_counter()
+        if now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            logger.info(
+                "Replayed %d inputs (%.1f inputs/s).", self._count, self._count / (now - self._start)
+            )
+
+
+# Test for replay.py
+if __name__ == "__main__":
+    import tempfile
+    setup_logging()
+    print("Testing replay.py...")
+    inputs = ["5 * 6", "x = 10", "What is 5 plus 5?", "5 / 0"] * 50
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "inputs.jsonl")
+        with open(input_path, "w") as f:
+            for text in inputs:
+                f.write(json.dumps({"input": text}) + "\n")
+        # Ordered JSONL output from a worker pool
+        output_path = os.path.join(tmp, "results.jsonl")
+        stats = ReplayPipeline(workers=2, chunk_size=16).replay(input_path, output_path)
+        with open(output_path) as f:
+            results = [json.loads(line) for line in f]
+        assert [r["input"] for r in results] == inputs
+        assert results[0]["response"] == "Bot: The result is 30."
+        print("Ordered JSONL replay:", stats)
+        # Unordered SQLite output in the current process
+        db_path = os.path.join(tmp, "results.db")
+        stats = ReplayPipeline(workers=0, chunk_size=16, ordered=False).replay(input_path, db_path)
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM replay_results").fetchone()[0] == len(inputs)
+        conn.close()
+        print("Unordered SQLite replay:", stats)
+        # Stateful sessions: each assignment must reach the engine that answers the session's next input
+        session_inputs = [(s, text) for s in range(6) for text in (f"x = {s}", "x * 2")]
+        with open(input_path, "w") as f:
+            for session, text in session_inputs:
+                f.write(json.dumps({"input": text, "session": f"user{session}"}) + "\n")
+        stats = ReplayPipeline(workers=2, chunk_size=3, session_field="session").replay(input_path, output_path)
+        with open(output_path) as f:
+            results = [json.loads(line) for line in f]
+        assert [r["input"] for r in results] == [text for _, text in session_inputs]
+        assert [r["response"] for r in results[1::2]] == [f"Bot: The result is {2 * s}.0." for s in range(6)]
+        print("Session-pinned replay:", stats)
+    print("All tests passed!")
@@ -0,0 +1,50 @@
+# safe_paths.py
+import os
+import re
+from typing import Tuple
+
+
+def resolve_in_directory(directory: str, path: str, extensions: Tuple[str, ...], kind: str = "File") -> str:
+    """
+    Resolves a user-supplied path inside a configured directory.
+
+    Args:
+        directory (str): The directory the path must stay in.
+        path (str): The path as given by the user, relative to the directory.
+        extensions (Tuple[str, ...]): The accepted file extensions, e.g. (".npy",).
+        kind (str): What the file is, for error messages, e.g. "Matrix". Defaults to "File".
+
+    Returns:
+        str: The absolute, symlink-free path of the file.
+
+    Raises:
+        ValueError: If the path is absolute, contains `..`, has another extension or leaves
+            the directory through a symbolic link.
+    """
+    if os.path.isabs(path) or os.path.splitdrive(path)[0]:
+        raise ValueError(f"{kind} paths must be relative to the {kind.lower()} directory, got '{path}'.")
+    if '..' in re.split(r'[\\/]', path):
+        raise ValueError(f"{kind} paths must not contain '..', got '{path}'.")
+    if not path.endswith(extensions):
+        raise ValueError(f"Expected a {' or '.join(extensions)} file, got '{path}'.")
+    root = os.path.realpath(directory)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"'{path}' is outside the {kind.lower()} directory.")
+    return resolved
+
+
+# Test for safe_paths.py
+if __name__ == "__main__":
+    import tempfile
+    print("Testing safe_paths.py...")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.symlink(os.path.dirname(tmp), os.path.join(tmp, "parent"))
+        assert resolve_in_directory(tmp, "sub/a.npy", (".npy",)) == os.path.join(os.path.realpath(tmp), "sub", "a.npy")
+        for bad in ("/etc/passwd.npy", "../a.npy", "sub/../../a.npy", "parent/a.npy", "a.txt"):
+            try:
+                resolve_in_directory(tmp, bad, (".npy",))
+                raise AssertionError(f"Expected ValueError for {bad}")
+            except ValueError as e:
+                print(f"Rejected {bad}: {e}")
+    print("All tests passed!")
@@ -0,0 +1,294 @@
+# scheduler.py
+import re
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COST_CLASSES = ("light", "medium", "heavy")
+
+SHED_MESSAGE = "Bot: Error - The server is busy, please retry later."
+
+# Routes that change the chatbot's variables and formulas; they run alone
+STATEFUL_ROUTES = ("assignment", "script")
+
+
+class RequestScheduler:
+    """
+    Schedules chatbot requests by estimated cost.
+
+    Each request is classified from its route and input features into a light,
+    medium or heavy cost class. Every class has its own FIFO queue, its own pool
+    of worker threads bounding its concurrency, and a queue limit beyond which
+    new requests are shed. While the light queue is backed up, heavy workers
+    defer starting new jobs so cheap requests keep low tail latency.
+
+    Requests on stateful routes (assignments, formulas and scripts) are
+    exclusive: they start once every running request has finished, and nothing
+    else starts until they are done. Within a class, a request therefore sees
+    the variables set by every stateful request submitted before it; requests
+    in different classes may still complete out of submission order.
+    """
+
+    def __init__(self, chatbot, concurrency: Dict[str, int] | None = None,
+                 queue_limits: Dict[str, int] | None = None, defer_threshold: int = 8):
+        """
+        Initializes the queues and starts the worker threads.
+
+        Args:
+            chatbot (ChatBot): The chatbot answering requests.
+            concurrency (Dict[str, int] | None): Worker threads per cost class.
+                Defaults to 4 light, 2 medium and 1 heavy.
+            queue_limits (Dict[str, int] | None): Maximum queued requests per cost class.
+                Defaults to 1000 light, 100 medium and 10 heavy.
+            defer_threshold (int): Light queue depth above which heavy work is deferred.
+                Defaults to 8.
+        """
+        self.chatbot = chatbot
+        self.concurrency = {"light": 4, "medium": 2, "heavy": 1, **(concurrency or {})}
+        self.queue_limits = {"light": 1000, "medium": 100, "heavy": 10, **(queue_limits or {})}
+        self.defer_threshold = defer_threshold
+        self._condition = threading.Condition()
+        self._queues: Dict[str, deque] = {c: deque() for c in COST_CLASSES}
+        self._running = {c: 0 for c in COST_CLASSES}
+        self._exclusive_running = False
+        self._completed = {c: 0 for c in COST_CLASSES}
+        self._shed = {c: 0 for c in COST_CLASSES}
+        self._deferrals = 0
+        self._latencies = {c: deque(maxlen=1000) for c in COST_CLASSES}
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._worker, args=(c,), name=f"scheduler-{c}-{i}", daemon=True)
+            for c in COST_CLASSES for i in range(self.concurrency[c])
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def estimate_cost(self, user_input: str) -> Tuple[str, str, float]:
+        """
+        Estimates the cost of a request from its route and input features.
+
+        Args:
+            user_input (str): The user's input.
+
+        Returns:
+            Tuple[str, str, float]: The route, the cost class and the estimated cost units.
+        """
+        text = user_input.strip()
+        if text == "get_variables" or text.split(' ', 1)[0] in ("history", "profile", "mem"):
+            return "command", "light", 1.0
+        if ';' in text or '\n' in text:
+            statements = len(re.findall(r'[;\n]', text)) + 1
+            return "script", "light" if statements <= 20 else "medium", float(statements)
+        if '=' in text and '@' not in text:
+            return "assignment", "light", 1.0
+        if 'd/dx' in text:
+            return "calculus", "medium", 100.0
+        if 'integrate' in text:
+            return "calculus", "heavy", 1000.0
+        if 'det' in text or 'inv' in text:
+            size = self._matrix_size(text)
+            cost = float(size) ** 3
+            return "linear_algebra", "light" if size <= 10 else "medium" if size <= 200 else "heavy", cost
+        if self.chatbot.language_utils.is_math_question(text):
+            return "nl_math", "light", 5.0
+        return "math", "light", 1.0 + len(text) / 100
+
+    def _matrix_size(self, text: str) -> int:
+        """Returns the order of a matrix given as a `.npy` file in the matrix directory or an inline list literal."""
+        file_match = re.search(r'@(\S+?\.npy)\b', text)
+        if file_match:
+            try:
+                path = self.chatbot.math_utils.resolve_matrix_path(file_match.group(1))
+                return max(np.load(path, mmap_mode='r').shape, default=0)
+            except (OSError, ValueError):
+                return 0
+        # Rows of an inline literal are the '[' one level below the outer bracket
+        return max(text.count('[') - 1, 1)
+
+    def submit(self, user_input: str) -> Future:
+        """
+        Queues a chatbot request according to its estimated cost.
+
+        Args:
+            user_input (str): The user's input.
+
+        Returns:
+            Future: Resolves to the chatbot's response, or a busy message if the request was shed.
+        """
+        route, cost_class, cost = self.estimate_cost(user_input)
+        return self.submit_call(cost_class, cost, self.chatbot.respond, user_input,
+                                exclusive=route in STATEFUL_ROUTES)
+
+    def submit_snn_step(self, inputs: List[Tuple[str, float]]) -> Future:
+        """
+        Queues an SNN step, costed by the number of inputs times the number of neurons.
+
+        Args:
+            inputs (List[Tuple[str, float]]): The step inputs.
+
+        Returns:
+            Future: Resolves to the step result, or raises RuntimeError if the step was shed.
+        """
+        cost = float(len(inputs) * max(len(self.chatbot.snn.neurons), 1))
+        cost_class = "light" if cost <= 1e3 else "medium" if cost <= 1e5 else "heavy"
+        return self.submit_call(cost_class, cost, self.chatbot.snn.step, inputs)
+
+    def submit_call(self, cost_class: str, cost: float, func: Callable, *args, exclusive: bool = False) -> Future:
+        """
+        Queues func(*args) in a cost class, shedding it if that class's queue is full.
+
+        Args:
+            cost_class (str): One of "light", "medium" or "heavy".
+            cost (float): The estimated cost, only used to pick the class; a class runs in FIFO order.
+            func (Callable): The work to run.
+            *args: The arguments passed to func.
+            exclusive (bool): Run with no other request in flight, for work that changes shared
+                state. Defaults to False.
+
+        Returns:
+            Future: Resolves to func's result.
+
+        Raises:
+            ValueError: If the cost class is unknown or the scheduler is shut down.
+        """
+        if cost_class not in COST_CLASSES:
+            raise ValueError(f"Unknown cost class '{cost_class}'.")
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise ValueError("The scheduler has been shut down.")
+            queue = self._queues[cost_class]
+            if len(queue) >= self.queue_limits[cost_class]:
+                self._shed[cost_class] += 1
+                shed = True
+            else:
+                queue.append((time.perf_counter(), future, func, args, exclusive))
+                self._condition.notify_all()
+                shed = False
+        if shed:
+            logger.warning("Shed a %s request; queue limit %d reached.", cost_class, self.queue_limits[cost_class])
+            if func == self.chatbot.respond:
+                future.set_result(SHED_MESSAGE)
+            else:
+                future.set_exception(RuntimeError("The server is busy, please retry later."))
+        return future
+
+    def _deferred(self, cost_class: str) -> bool:
+        """Heavy work waits while the light queue is backed up."""
+        return cost_class == "heavy" and len(self._queues["light"]) > self.defer_threshold
+
+    def _can_start(self, cost_class: str) -> bool:
+        """Whether the head of a class's queue may start now; called with the condition held."""
+        queue = self._queues[cost_class]
+        if not queue or self._exclusive_running or self._deferred(cost_class):
+            return False
+        if queue[0][4]:  # Exclusive: wait for everything in flight to finish
+            return not any(self._running.values())
+        # Drain for an exclusive request waiting at the head of any queue, so it cannot starve
+        return not any(q and q[0][4] for q in self._queues.values())
+
+    def _worker(self, cost_class: str) -> None:
+        """Runs queued work of one cost class until shutdown."""
+        queue = self._queues[cost_class]
+        while True:
+            with self._condition:
+                while not self._can_start(cost_class):
+                    if self._closed and not queue:
+                        return
+                    if queue and self._deferred(cost_class):
+                        self._deferrals += 1
+                    self._condition.wait()
+                enqueued_at, future, func, args, exclusive = queue.popleft()
+                self._running[cost_class] += 1
+                self._exclusive_running = exclusive
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            with self._condition:
+                self._running[cost_class] -= 1
+                self._exclusive_running = False
+                self._completed[cost_class] += 1
+                self._latencies[cost_class].append(time.perf_counter() - enqueued_at)
+                self._condition.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns queue depths, running and completed counts, shed counts and latency
+        percentiles (over the last 1000 requests) per cost class.
+        """
+        with self._condition:
+            metrics = {"deferrals": self._deferrals}
+            for c in COST_CLASSES:
+                latencies = sorted(self._latencies[c])
+                metrics[c] = {
+                    "queued": len(self._queues[c]),
+                    "running": self._running[c],
+                    "completed": self._completed[c],
+                    "shed": self._shed[c],
+                    "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+                    "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+                }
+            return metrics
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops accepting work; workers finish the queued requests and exit."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+
+# Test for scheduler.py
+if __name__ == "__main__":
+    import io
+    import contextlib
+    from chatbot import ChatBot
+    print("Testing scheduler.py...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot = ChatBot(run_tests=False)
+        scheduler = RequestScheduler(chatbot, queue_limits={"heavy": 2})
+        assert scheduler.estimate_cost("5 * 6")[1] == "light"
+        assert scheduler.estimate_cost("integrate(x^2, x)")[1] == "heavy"
+        heavy = [scheduler.submit(f"integrate(x^{n} * sin(x), x)") for n in range(2, 8)]
+        light = [scheduler.submit(f"{n} * 6") for n in range(50)]
+        light_results = [future.result() for future in light]
+        heavy_results = [future.result() for future in heavy]
+        metrics = scheduler.metrics()
+        scheduler.shutdown()
+    assert light_results[5] == "Bot: The result is 30."
+    # A class runs in submission order, and assignments are not overtaken by cheaper reads
+    with contextlib.redirect_stdout(io.StringIO()):
+        ordered = RequestScheduler(chatbot, concurrency={"light": 1})
+        futures = [ordered.submit("x + 7"), ordered.submit("x = 10"), ordered.submit("x + 7")]
+        assert [future.result() for future in futures][1:] == ["Bot: Variable 'x' set to 10.", "Bot: The result is 17.0."]
+        ordered.shutdown()
+        # With several workers, every read sees the assignment submitted just before it
+        concurrent = RequestScheduler(chatbot)
+        futures = [(n, concurrent.submit(f"x = {n}"), concurrent.submit("x + 7")) for n in range(30)]
+        assert all(read.result() == f"Bot: The result is {n + 7}.0." for n, _, read in futures)
+        concurrent.shutdown()
+    # Matrix files are only sized inside the matrix directory
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot.math_utils.matrix_dir = os.path.join(tmp, "matrices")
+        os.mkdir(chatbot.math_utils.matrix_dir)
+        np.save(os.path.join(chatbot.math_utils.matrix_dir, "big.npy"), np.zeros((300, 300)))
+        np.save(os.path.join(tmp, "outside.npy"), np.zeros((300, 300)))
+        assert scheduler.estimate_cost("det @big.npy")[1] == "heavy"
+        assert scheduler.estimate_cost("det @../outside.npy")[1] == "light"
+        assert scheduler.estimate_cost(f"det @{os.path.join(tmp, 'outside.npy')}")[1] == "light"
+    assert heavy_results.count(SHED_MESSAGE) == metrics["heavy"]["shed"] > 0
+    print("Metrics:", metrics)
+    print("All tests passed!")
@@ -1,5 +1,6 @@
 # setup_database.py
 import sqlite3
+from history import MathHistory
 
 # Connect to the SQLite database (or create it if it doesn't exist)
 conn = sqlite3.connect("chatbot.db")
@@ -18,6 +19,9 @@ CREATE TABLE IF NOT EXISTS math_operations (
 conn.commit()
 conn.close()
 
+# Add the history timestamp column, indexes and full-text search table
+MathHistory("chatbot.db").close()
+
 print("Database and tables created successfully!")
 
 # Test for setup_database.py
@@ -0,0 +1,88 @@
+# single_flight.py
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls.
+
+    The first caller for a key runs the function; callers that arrive with the
+    same key while it is running wait for and share its result (or exception).
+    Nothing is cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.executed = 0  # Calls that ran the function
+        self.coalesced = 0  # Calls that shared another caller's result
+
+    def do(self, key: Hashable, func: Callable, *args) -> Any:
+        """
+        Runs func(*args) unless an identical call is already in flight.
+
+        Args:
+            key (Hashable): The normalized request identity.
+            func (Callable): The function to run.
+            *args: The arguments passed to func.
+
+        Returns:
+            Any: The result of the single shared call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Returns the number of distinct calls currently running."""
+        with self._lock:
+            return len(self._calls)
+
+
+# Test for single_flight.py
+if __name__ == "__main__":
+    import time
+    print("Testing single_flight.py...")
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    def slow_square(n):
+        release.wait()
+        return n * n
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(single_flight.do(("square", 7), slow_square, 7)))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    print("Results:", results)
+    assert results == [49] * 10
+    assert single_flight.executed == 1 and single_flight.coalesced == 9
+    assert single_flight.in_flight() == 0
+    print("All tests passed!")
@@ -1,25 +1,187 @@
 # snn.py
 import re
+import sys
+import math
 import random
 import logging
+import threading
+from array import array
+from functools import partial
 from collections import defaultdict, Counter
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
+
+import numpy as np
+
+from logging_utils import RateLimitedLogger, setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
+# Per-step messages are sampled, one limiter per message so suppressed counts stay attached to it
+step_logger = RateLimitedLogger(logger)
+run_logger = RateLimitedLogger(logger)
+
+
+def _as_numpy(values: array) -> np.ndarray:
+    """Return a zero-copy NumPy view over a typed array column."""
+    return np.frombuffer(values, dtype=values.typecode)
+
+
+def _rate_field(name: str) -> property:
+    """Build a property for a synapse rate; writing it overrides the store's rate for that synapse."""
+    def getter(self):
+        return self._store.get_rate(name, self._index)
+
+    def setter(self, value):
+        self._store.set_rate(name, self._index, value)
+    return property(getter, setter)
+
+
+def _store_field(name: str) -> property:
+    """Build a property that reads and writes one column of a view's backing store."""
+    def getter(self):
+        return getattr(self._store, name)[self._index]
+
+    def setter(self, value):
+        getattr(self._store, name)[self._index] = value
+    return property(getter, setter)
+
+
+class NeuronStore:
+    """
+    Struct-of-arrays storage for neuron state.
+
+    Every neuron attribute is a typed array indexed by neuron position, and entity
+    names are interned once and referenced by id.
+    """
+    __slots__ = ("potential", "threshold", "decay", "last_spike_time", "entity_id", "names", "name_ids")
+
+    def __init__(self):
+        self.potential = array("d")
+        self.threshold = array("d")
+        self.decay = array("d")
+        self.last_spike_time = array("q")
+        self.entity_id = array("q")
+        self.names: List[str] = [""]
+        self.name_ids: Dict[str, int] = {"": 0}
+
+    def __len__(self) -> int:
+        return len(self.potential)
+
+    def append(self, threshold: float, decay: float) -> int:
+        """Append a resting neuron and return its index."""
+        self.potential.append(0.0)
+        self.threshold.append(threshold)
+        self.decay.append(decay)
+        self.last_spike_time.append(-1)
+        self.entity_id.append(0)
+        return len(self.potential) - 1
+
+    def intern(self, name: str) -> int:
+        """Return the id of an entity name, storing the name on first use."""
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            name = sys.intern(name)
+            self.names.append(name)
+            self.name_ids[name] = name_id
+        return name_id
+
+
+# Weight storage modes: array typecode and fixed-point scale (None for floating point)
+WEIGHT_PRECISIONS = {"float64": ("d", None), "uint16": ("H", 65535), "uint8": ("B", 255)}
+
+
+class SynapseStore:
+    """
+    Struct-of-arrays storage for synapse state, one typed array per attribute.
+
+    Weights lie in [0, 1], so besides float64 they can be stored as uint16 or uint8
+    fixed point (code = weight * scale). Quantized weights are rounded
+    stochastically, which keeps small STDP updates unbiased on average.
+
+    The learning and STDP rates are shared by every synapse of a store, and times
+    and row indices are 32-bit, so a uint8 synapse costs about 10 bytes. A synapse
+    can override either rate; the first override of a rate adds a float64 column
+    for it, holding NaN for synapses that use the store's rate.
+    """
+    __slots__ = ("weight", "learning_rate", "stdp_rate", "learning_rates", "stdp_rates",
+                 "last_used_time", "weight_scale", "rng")
+
+    def __init__(self, weight_precision: str = "float64", learning_rate: float = 0.01, stdp_rate: float = 0.1):
+        if weight_precision not in WEIGHT_PRECISIONS:
+            logger.error("Unknown weight precision.")
+            raise ValueError(
+                f"Unknown weight precision '{weight_precision}'. Use one of {', '.join(WEIGHT_PRECISIONS)}."
+            )
+        typecode, self.weight_scale = WEIGHT_PRECISIONS[weight_precision]
+        self.weight = array(typecode)
+        self.learning_rate = learning_rate
+        self.stdp_rate = stdp_rate
+        self.learning_rates: array | None = None  # Per-synapse overrides, created on first use
+        self.stdp_rates: array | None = None
+        self.last_used_time = array("i")  # Time steps fit in 32 bits
+        self.rng = random.Random()  # Separate from the global generator used for initial weights
+
+    def __len__(self) -> int:
+        return len(self.weight)
+
+    def encode_weight(self, weight: float) -> float | int:
+        """Convert a weight to its stored form, rounding stochastically to fixed point."""
+        if self.weight_scale is None:
+            return weight
+        scaled = min(max(weight, 0.0), 1.0) * self.weight_scale
+        code = math.floor(scaled)
+        return code + (self.rng.random() < scaled - code)
+
+    def decode_weight(self, code: float | int) -> float:
+        """Convert a stored weight back to a float."""
+        return code if self.weight_scale is None else code / self.weight_scale
+
+    def get_rate(self, name: str, index: int) -> float:
+        """Return a synapse's "learning_rate" or "stdp_rate": its override if set, else the store's."""
+        overrides = getattr(self, name + "s")
+        if overrides is not None and not math.isnan(overrides[index]):
+            return overrides[index]
+        return getattr(self, name)
+
+    def set_rate(self, name: str, index: int, value: float) -> None:
+        """Override a synapse's "learning_rate" or "stdp_rate"."""
+        overrides = getattr(self, name + "s")
+        if overrides is None:
+            overrides = array("d", [math.nan]) * len(self)
+            setattr(self, name + "s", overrides)
+        overrides[index] = value
+
+    def append(self, weight: float) -> int:
+        """Append an unused synapse and return its index."""
+        self.weight.append(self.encode_weight(weight))
+        self.last_used_time.append(-1)
+        for overrides in (self.learning_rates, self.stdp_rates):
+            if overrides is not None:
+                overrides.append(math.nan)
+        return len(self.weight) - 1
 
 
 class Neuron:
-    def __init__(self, threshold: float = 0.5, decay: float = 0.8):
-        self.potential: float = 0.0
-        self.threshold: float = threshold
-        self.decay: float = decay
-        self.last_spike_time: int = -1
-        self.entity_name: str = ""
+    """A view over one neuron in a `NeuronStore`; standalone neurons get a private store."""
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, threshold: float = 0.5, decay: float = 0.8,
+                 store: NeuronStore | None = None, index: int | None = None):
+        self._store = store if store is not None else NeuronStore()
+        self._index = self._store.append(threshold, decay) if index is None else index
+
+    potential = _store_field("potential")
+    threshold = _store_field("threshold")
+    decay = _store_field("decay")
+    last_spike_time = _store_field("last_spike_time")
+
+    @property
+    def entity_name(self) -> str:
+        return self._store.names[self._store.entity_id[self._index]]
+
+    @entity_name.setter
+    def entity_name(self, name: str) -> None:
+        self._store.entity_id[self._index] = self._store.intern(name)
 
     def integrate(self, input_spike: float, current_time: int) -> bool:
         """
@@ -38,21 +200,47 @@ class Neuron:
         if not isinstance(input_spike, (int, float)):
             logger.error("Input spike must be a numeric value.")
             raise ValueError("Input spike must be a numeric value.")
-        self.potential += input_spike
-        if self.potential >= self.threshold:
-            self.potential = 0.0  # Reset potential after spiking
-            self.last_spike_time = current_time
+        store, index = self._store, self._index
+        potential = store.potential[index] + input_spike
+        if potential >= store.threshold[index]:
+            store.potential[index] = 0.0  # Reset potential after spiking
+            store.last_spike_time[index] = current_time
             return True  # Neuron spiked
-        self.potential *= self.decay  # Decay potential over time
+        store.potential[index] = potential * store.decay[index]  # Decay potential over time
         return False  # Neuron did not spike
 
 
 class Synapse:
-    def __init__(self, weight: float = 0.5, learning_rate: float = 0.01, stdp_rate: float = 0.1):
-        self.weight: float = weight
-        self.learning_rate: float = learning_rate
-        self.stdp_rate: float = stdp_rate
-        self.last_used_time: int = -1
+    """
+    A view over one synapse in a `SynapseStore`; standalone synapses get a private store.
+
+    Rates that differ from a shared store's are kept as overrides for this synapse only.
+    """
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, weight: float = 0.5, learning_rate: float | None = None, stdp_rate: float | None = None,
+                 store: SynapseStore | None = None, index: int | None = None):
+        if store is None:
+            store = SynapseStore(learning_rate=0.01 if learning_rate is None else learning_rate,
+                                 stdp_rate=0.1 if stdp_rate is None else stdp_rate)
+        self._store = store
+        self._index = store.append(weight) if index is None else index
+        if learning_rate not in (None, store.learning_rate):
+            self.learning_rate = learning_rate
+        if stdp_rate not in (None, store.stdp_rate):
+            self.stdp_rate = stdp_rate
+
+    learning_rate = _rate_field("learning_rate")
+    stdp_rate = _rate_field("stdp_rate")
+    last_used_time = _store_field("last_used_time")
+
+    @property
+    def weight(self) -> float:
+        return self._store.decode_weight(self._store.weight[self._index])
+
+    @weight.setter
+    def weight(self, value: float) -> None:
+        self._store.weight[self._index] = self._store.encode_weight(value)
 
     def transmit(self, spike: float) -> float:
         """
@@ -76,18 +264,94 @@ class Synapse:
         """
         if pre_spike_time != -1 and post_spike_time != -1:
             time_diff = post_spike_time - pre_spike_time
-            self.weight += self.stdp_rate * time_diff
-            self.weight = max(0.0, min(1.0, self.weight))
+            store, index = self._store, self._index
+            if store.weight_scale is None:
+                self.weight += self.stdp_rate * time_diff
+                self.weight = max(0.0, min(1.0, self.weight))
+            else:
+                # Update the fixed-point code directly with a stochastically rounded step
+                scaled = self.stdp_rate * time_diff * store.weight_scale
+                step = math.floor(scaled)
+                step += store.rng.random() < scaled - step
+                store.weight[index] = min(max(store.weight[index] + step, 0), store.weight_scale)
             self.last_used_time = max(pre_spike_time, post_spike_time)
 
 
+class SynapseRow:
+    """
+    The outgoing synapses of one neuron, as a mapping from target neuron index to `Synapse`.
+
+    Only a `SynapseStore` index is kept per target; `Synapse` views are created on access.
+    """
+    __slots__ = ("_store", "indices", "_count")
+
+    def __init__(self, store: SynapseStore):
+        self._store = store
+        self.indices = array("i")  # store index per target, -1 if missing
+        self._count = 0
+
+    def __contains__(self, j: int) -> bool:
+        return 0 <= j < len(self.indices) and self.indices[j] != -1
+
+    def __getitem__(self, j: int) -> Synapse:
+        if j not in self:
+            raise KeyError(j)
+        return Synapse(store=self._store, index=self.indices[j])
+
+    def __setitem__(self, j: int, synapse: Synapse) -> None:
+        if synapse._store is self._store:
+            index = synapse._index
+        else:
+            index = self._store.append(synapse.weight)
+            self._store.last_used_time[index] = synapse.last_used_time
+            for name in ("learning_rate", "stdp_rate"):
+                if getattr(synapse, name) != getattr(self._store, name):
+                    self._store.set_rate(name, index, getattr(synapse, name))
+        if j >= len(self.indices):
+            self.indices.extend([-1] * (j + 1 - len(self.indices)))
+        if self.indices[j] == -1:
+            self._count += 1
+        self.indices[j] = index
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        return (j for j, index in enumerate(self.indices) if index != -1)
+
+    def items(self) -> Iterator[Tuple[int, Synapse]]:
+        return ((j, self[j]) for j in self)
+
+    def values(self) -> Iterator[Synapse]:
+        return (self[j] for j in self)
+
+
 class SpikingNeuralNetwork:
-    def __init__(self):
+    def __init__(self, weight_precision: str = "float64"):
+        """
+        Args:
+            weight_precision (str): Synapse weight storage, "float64" (default) or
+                fixed-point "uint16" or "uint8".
+        """
+        self.neuron_store = NeuronStore()
+        self.synapse_store = SynapseStore(weight_precision)
         self.neurons: List[Neuron] = []
-        self.synapses: Dict[int, Dict[int, Synapse]] = defaultdict(dict)
+        self.synapses: Dict[int, SynapseRow] = defaultdict(partial(SynapseRow, self.synapse_store))
         self.current_time: int = 0
         self.spike_history: Counter[int] = Counter()
         self.entity_to_neuron: Dict[str, int] = {}
+        # Serializes every mutation: scheduler steps and the spike encoder run on different threads
+        self.lock = threading.RLock()
+
+    def __getstate__(self) -> dict:
+        """Pickle everything but the lock, which cannot be pickled."""
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
 
     def add_neuron(self, entity_name: str) -> Neuron:
         """
@@ -105,12 +369,13 @@ class SpikingNeuralNetwork:
         if not entity_name:
             logger.error("Entity name cannot be empty.")
             raise ValueError("Entity name cannot be empty.")
-        neuron = Neuron()
-        neuron.entity_name = entity_name
-        self.neurons.append(neuron)
-        self.entity_to_neuron[entity_name] = len(self.neurons) - 1
-        logger.info(
-            f"Added a new neuron for entity: {entity_name}. Total neurons: {len(self.neurons)}."
+        with self.lock:
+            neuron = Neuron(store=self.neuron_store)
+            neuron.entity_name = entity_name
+            self.neurons.append(neuron)
+            self.entity_to_neuron[entity_name] = len(self.neurons) - 1
+        logger.debug(
+            "Added a new neuron for entity: %s. Total neurons: %d.", entity_name, len(self.neurons)
         )
         return neuron
 
@@ -136,42 +401,204 @@ class SpikingNeuralNetwork:
             raise ValueError(
                 "Inputs must be a list of tuples (entity_name, spike_value)."
             )
-        spikes = []
-        for entity_name, input_spike in inputs:
-            if not entity_name:
-                logger.error("Entity name cannot be empty.")
-                raise ValueError("Entity name cannot be empty.")
-            # Ensure the neuron for this entity exists
-            if entity_name not in self.entity_to_neuron:
-                self.add_neuron(entity_name)
-            neuron_index = self.entity_to_neuron[entity_name]
-            neuron = self.neurons[neuron_index]
-            # Process spikes for all neurons
-            for j, other_neuron in enumerate(self.neurons):
-                if j not in self.synapses[neuron_index]:
-                    # Initialize a new synapse with a random weight
-                    self.synapses[neuron_index][j] = Synapse(
-                        random.uniform(0.1, 1.0)
-                    )
-                synapse = self.synapses[neuron_index][j]
-                transmitted_spike = synapse.transmit(input_spike)
-                spiked = other_neuron.integrate(transmitted_spike, self.current_time)
-                spikes.append(spiked)
-                self.spike_history[self.current_time] += int(spiked)
-                if spiked and input_spike:
-                    synapse.adjust_weight(
-                        self.current_time - 1, self.current_time
-                    )
-        self.current_time += 1
-        logger.info(f"Step completed at time {self.current_time}.")
-        return {
-            "any_spikes": any(spikes),
-            "spikes": spikes,
-            "current_time": self.current_time,
-            "total_neurons": len(self.neurons),
-            "total_synapses": sum(len(synapses) for synapses in self.synapses.values()),
-            "spike_history": dict(self.spike_history)
-        }
+        if not all(entity_name for entity_name, _ in inputs):
+            logger.error("Entity name cannot be empty.")
+            raise ValueError("Entity name cannot be empty.")
+        with self.lock:
+            spikes = []
+            # Read and write the store columns directly; a Synapse view is only built for STDP
+            neurons, synapses = self.neuron_store, self.synapse_store
+            decay, last_spike_time = neurons.decay, neurons.last_spike_time
+            weight_codes, scale = synapses.weight, synapses.weight_scale
+            if scale is None:
+                potential, threshold = neurons.potential, neurons.threshold
+            else:
+                # Integrate in fixed-point units, as run_chunks does, so weight codes are added without decoding
+                potential, threshold = array("d"), array("d")
+            current_time = self.current_time
+            for entity_name, input_spike in inputs:
+                # Ensure the neuron for this entity exists
+                if entity_name not in self.entity_to_neuron:
+                    self.add_neuron(entity_name)
+                neuron_index = self.entity_to_neuron[entity_name]
+                row = self.synapses[neuron_index]
+                neuron_count = len(self.neurons)
+                if len(potential) < neuron_count:  # Scaled copies of the neurons added so far
+                    potential.extend(p * scale for p in neurons.potential[len(potential):])
+                    threshold.extend(t * scale for t in neurons.threshold[len(threshold):])
+                if len(row) < neuron_count:
+                    for j in range(neuron_count):
+                        if j not in row:
+                            # Initialize a new synapse with a random weight
+                            row[j] = Synapse(random.uniform(0.1, 1.0), store=synapses)
+                indices = row.indices
+                # Process spikes for all neurons
+                spike_count = 0
+                for j in range(neuron_count):
+                    index = indices[j]
+                    transmitted_spike = weight_codes[index] if input_spike else 0
+                    potential_j = potential[j] + transmitted_spike
+                    spiked = potential_j >= threshold[j]
+                    if spiked:
+                        potential[j] = 0.0  # Reset potential after spiking
+                        last_spike_time[j] = current_time
+                        spike_count += 1
+                        if input_spike:
+                            Synapse(store=synapses, index=index).adjust_weight(current_time - 1, current_time)
+                    else:
+                        potential[j] = potential_j * decay[j]  # Decay potential over time
+                    spikes.append(spiked)
+                self.spike_history[current_time] += spike_count
+            if scale is not None:
+                neurons.potential[:len(potential)] = array("d", (p / scale for p in potential))
+            self.current_time += 1
+            step_logger.info("Step completed at time %d.", self.current_time)
+            return {
+                "any_spikes": any(spikes),
+                "spikes": spikes,
+                "current_time": self.current_time,
+                "total_neurons": len(self.neurons),
+                "total_synapses": sum(len(synapses) for synapses in self.synapses.values()),
+                "spike_history": dict(self.spike_history)
+            }
+
+    def run(self, inputs_matrix, steps: int | None = None, neuron_indices=None) -> np.ndarray:
+        """
+        Simulate several steps in one call over a pre-encoded input matrix.
+
+        Args:
+            inputs_matrix: A T x K array of spike values; row t holds the inputs of step t.
+            steps (int | None): The number of steps to run. Defaults to all rows of the matrix.
+            neuron_indices: The pre-resolved neuron index of each of the K columns.
+                Defaults to neurons 0..K-1.
+
+        Returns:
+            np.ndarray: A T x N boolean spike raster, True where neuron j spiked during step t.
+
+        Raises:
+            ValueError: If the input matrix or neuron indices are malformed.
+        """
+        chunks = list(self.run_chunks(inputs_matrix, steps, neuron_indices))
+        if not chunks:
+            return np.zeros((0, len(self.neurons)), dtype=bool)
+        return np.concatenate(chunks)
+
+    def run_chunks(self, inputs_matrix, steps: int | None = None, neuron_indices=None,
+                   chunk_size: int = 1024) -> Iterator[np.ndarray]:
+        """
+        Simulate several steps over a pre-encoded input matrix, streaming the spike raster.
+
+        Equivalent to calling `step` once per row with the columns as
+        `(entity_name, spike)` tuples in order, but the neuron and synapse state is
+        copied into arrays once per chunk instead of being validated, logged and
+        reported on every tick.
+
+        Args:
+            inputs_matrix: A T x K array of spike values; row t holds the inputs of step t.
+            steps (int | None): The number of steps to run. Defaults to all rows of the matrix.
+            neuron_indices: The pre-resolved neuron index of each of the K columns.
+                Defaults to neurons 0..K-1.
+            chunk_size (int): The number of steps per yielded raster chunk. Defaults to 1024.
+
+        Yields:
+            np.ndarray: A chunk_size x N boolean spike raster for each chunk of steps.
+
+        Raises:
+            ValueError: If the input matrix or neuron indices are malformed.
+        """
+        inputs_matrix = np.asarray(inputs_matrix, dtype=float)
+        if inputs_matrix.ndim != 2:
+            logger.error("Input matrix must be two-dimensional (steps x inputs).")
+            raise ValueError("Input matrix must be two-dimensional (steps x inputs).")
+        if neuron_indices is None:
+            neuron_indices = range(inputs_matrix.shape[1])
+        neuron_indices = np.asarray(neuron_indices, dtype=int)
+        if neuron_indices.shape != (inputs_matrix.shape[1],):
+            logger.error("Expected one neuron index per input column.")
+            raise ValueError("Expected one neuron index per input column.")
+        if neuron_indices.size and (neuron_indices.min() < 0 or neuron_indices.max() >= len(self.neurons)):
+            logger.error("Neuron index out of range.")
+            raise ValueError("Neuron index out of range.")
+        if steps is None:
+            steps = inputs_matrix.shape[0]
+        if steps > inputs_matrix.shape[0]:
+            logger.error("Input matrix has fewer rows than the requested steps.")
+            raise ValueError("Input matrix has fewer rows than the requested steps.")
+
+        with self.lock:
+            # Create missing synapses in the same order step() would
+            neuron_count = len(self.neurons)
+            for neuron_index in neuron_indices:
+                row = self.synapses[neuron_index]
+                for j in range(neuron_count):
+                    if j not in row:
+                        row[j] = Synapse(random.uniform(0.1, 1.0), store=self.synapse_store)
+
+            # Unique source rows; duplicate columns share the same synapses
+            sources, source_of_column = np.unique(neuron_indices, return_inverse=True)
+            synapse_index = np.array(
+                [self.synapses[i].indices[:neuron_count] for i in sources], dtype=np.int64
+            ).reshape(len(sources), neuron_count)
+        neurons, synapses = self.neuron_store, self.synapse_store
+        scale, stdp_rate = synapses.weight_scale, synapses.stdp_rate
+        if scale is not None:
+            rng = np.random.default_rng(synapses.rng.getrandbits(64))
+
+        for start in range(0, steps, chunk_size):
+            stop = min(start + chunk_size, steps)
+            raster = np.zeros((stop - start, neuron_count), dtype=bool)
+            # State is copied in and written back under the lock once per chunk, so steps
+            # from other threads between chunks are kept; the lock is not held across a yield
+            with self.lock:
+                weights = _as_numpy(synapses.weight)[synapse_index]
+                last_used = _as_numpy(synapses.last_used_time)[synapse_index]
+                potentials = _as_numpy(neurons.potential)[:neuron_count].copy()
+                thresholds = _as_numpy(neurons.threshold)[:neuron_count].copy()
+                decays = _as_numpy(neurons.decay)[:neuron_count].copy()
+                last_spike = _as_numpy(neurons.last_spike_time)[:neuron_count].copy()
+                if synapses.stdp_rates is not None:
+                    # Per-synapse overrides, NaN where the store's rate applies
+                    rates = _as_numpy(synapses.stdp_rates)[synapse_index]
+                    stdp_rate = np.where(np.isnan(rates), synapses.stdp_rate, rates)
+                if scale is not None:
+                    # Integrate in fixed-point units so weight codes are added without decoding
+                    potentials *= scale
+                    thresholds *= scale
+                for t in range(start, stop):
+                    spiked_row = raster[t - start]
+                    spike_count = 0
+                    for k, input_spike in enumerate(inputs_matrix[t]):
+                        source = source_of_column[k]
+                        if input_spike:
+                            potentials += weights[source]
+                        fired = potentials >= thresholds
+                        potentials[fired] = 0.0
+                        last_spike[fired] = self.current_time
+                        np.multiply(potentials, decays, out=potentials, where=~fired)
+                        spiked_row |= fired
+                        spike_count += int(np.count_nonzero(fired))
+                        # adjust_weight ignores a pre-synaptic time of -1, i.e. the first step
+                        if input_spike and self.current_time > 0 and fired.any():
+                            rate = stdp_rate if np.isscalar(stdp_rate) else stdp_rate[source, fired]
+                            if scale is None:
+                                adjusted = np.clip(weights[source, fired] + rate, 0.0, 1.0)
+                            else:
+                                # Stochastic rounding: floor(x + u) with u uniform in [0, 1)
+                                codes = weights[source, fired]
+                                increments = np.floor(rate * scale + rng.random(codes.shape))
+                                adjusted = np.clip(codes + increments, 0, scale)
+                            weights[source, fired] = adjusted
+                            last_used[source, fired] = self.current_time
+                    self.spike_history[self.current_time] += spike_count
+                    self.current_time += 1
+
+                # Write the chunk's state back so the object view stays consistent
+                _as_numpy(neurons.potential)[:neuron_count] = potentials if scale is None else potentials / scale
+                _as_numpy(neurons.last_spike_time)[:neuron_count] = last_spike
+                _as_numpy(synapses.weight)[synapse_index] = weights
+                _as_numpy(synapses.last_used_time)[synapse_index] = last_used
+            yield raster
+        run_logger.info("Ran %d steps; now at time %d.", steps, self.current_time)
 
     def analyze_expression(self, expression: str) -> str | None:
         """
@@ -219,6 +646,8 @@ class SpikingNeuralNetwork:
 
 # Test for snn.py
 if __name__ == "__main__":
+    import tracemalloc
+    setup_logging()
     print("Testing snn.py...")
     snn = SpikingNeuralNetwork()
     # Test adding a neuron
@@ -228,6 +657,123 @@ if __name__ == "__main__":
     print("Running step function with input [('input1', 1.0)]...")
     result = snn.step([("input1", 1.0)])
     print("Step result:", result)
+    # Test run matches repeated step calls
+    random.seed(0)
+    stepped = SpikingNeuralNetwork()
+    for name in ("a", "b", "c"):
+        stepped.add_neuron(name)
+    inputs_matrix = [[1.0, 0.0, 1.0], [0.0, 1.0, 1.0], [1.0, 1.0, 0.0]]
+    expected = []
+    for row in inputs_matrix:
+        spikes = stepped.step([(name, value) for name, value in zip("abc", row)])["spikes"]
+        expected.append([any(spikes[j::3]) for j in range(3)])
+    random.seed(0)
+    batched = SpikingNeuralNetwork()
+    for name in ("a", "b", "c"):
+        batched.add_neuron(name)
+    raster = batched.run(inputs_matrix, steps=3)
+    assert raster.tolist() == expected
+    assert [n.potential for n in batched.neurons] == [n.potential for n in stepped.neurons]
+    assert batched.spike_history == stepped.spike_history
+    assert all(
+        batched.synapses[i][j].weight == stepped.synapses[i][j].weight
+        for i in range(3) for j in range(3)
+    )
+    print("Batched run raster:", raster.tolist())
+    # Test step integrates quantized weights in fixed-point units, exactly as run does
+    # (one step, since the first step makes no STDP updates)
+    networks = []
+    for simulate in (lambda network: network.step([(f"entity{i}", 1.0) for i in range(20)]),
+                     lambda network: network.run(np.ones((1, 20)))):
+        quantized = SpikingNeuralNetwork(weight_precision="uint8")
+        for i in range(20):
+            quantized.add_neuron(f"entity{i}").threshold = 3.0
+        random.seed(2)
+        quantized.synapse_store.rng.seed(2)
+        simulate(quantized)
+        networks.append(quantized)
+    assert list(networks[0].neuron_store.potential) == list(networks[1].neuron_store.potential)
+    # Test rates can be set per synapse, overriding the network's
+    custom = Synapse(0.5, learning_rate=0.05, stdp_rate=0.2, store=batched.synapse_store)
+    batched.synapses[0][1] = custom
+    batched.synapses[2][1] = Synapse(0.5, stdp_rate=0.3)
+    batched.synapses[1][1].learning_rate = 0.07
+    assert (custom.learning_rate, custom.stdp_rate) == (0.05, 0.2)
+    assert (batched.synapses[2][1].learning_rate, batched.synapses[2][1].stdp_rate) == (0.01, 0.3)
+    assert batched.synapses[1][1].learning_rate == 0.07 and batched.synapses[1][2].stdp_rate == 0.1
+    custom.weight = 0.5
+    custom.adjust_weight(0, 1)
+    assert custom.weight == 0.7
+    batched.synapses[2][1].weight = batched.synapses[2][2].weight = 0.5
+    batched.neurons[1].threshold = batched.neurons[2].threshold = 0.0  # Spike on every input
+    batched.run([[0.0, 0.0, 1.0]])
+    assert batched.synapses[2][1].weight == 0.8 and batched.synapses[2][2].weight == 0.6
+    # Test concurrent step and run calls on one network lose no updates
+    shared = SpikingNeuralNetwork()
+    for i in range(20):
+        shared.add_neuron(f"entity{i}")
+
+    def stepper():
+        for _ in range(200):
+            shared.step([("entity0", 1.0), ("entity1", 0.0)])
+
+    def runner():
+        for _ in range(200):
+            shared.run(np.ones((1, 3)), neuron_indices=[2, 3, 4])
+
+    threads = [threading.Thread(target=stepper), threading.Thread(target=runner)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert shared.current_time == 400 and sorted(shared.spike_history) == list(range(400))
+    # Test a network survives pickling, for ForkServer(snn_state_path=...)
+    import pickle
+    restored = pickle.loads(pickle.dumps(shared))
+    assert restored.current_time == 400 and restored.entity_to_neuron == shared.entity_to_neuron
+    assert restored.synapses[0][5].weight == shared.synapses[0][5].weight
+    assert restored.step([("entity0", 1.0)])["current_time"] == 401
+    # Measure memory per neuron and, for each weight precision, per synapse
+    for precision in WEIGHT_PRECISIONS:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        sized = SpikingNeuralNetwork(weight_precision=precision)
+        for i in range(300):
+            sized.add_neuron(f"entity{i}")
+        after_neurons = tracemalloc.take_snapshot()
+        sized.run(np.ones((1, 300)))
+        after_synapses = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        # Count only allocations made here, not one-off imports and caches of NumPy's random module
+        before, after_neurons, after_synapses = (
+            snapshot.filter_traces([tracemalloc.Filter(True, __file__)])
+            for snapshot in (before, after_neurons, after_synapses)
+        )
+        neuron_bytes = sum(stat.size_diff for stat in after_neurons.compare_to(before, "filename"))
+        synapse_bytes = sum(stat.size_diff for stat in after_synapses.compare_to(after_neurons, "filename"))
+        if precision == "float64":
+            print(f"Memory per neuron: {neuron_bytes / 300:.1f} bytes")
+        print(f"Memory per synapse ({precision}): {synapse_bytes / 90_000:.1f} bytes")
+        assert synapse_bytes / 90_000 < 12 + sized.synapse_store.weight.itemsize
+    # Compare quantized weights against the float baseline on sparse inputs with a raised
+    # threshold, so that a neuron only spikes after several inputs and rounding can matter
+    inputs_matrix = np.random.default_rng(1).random((200, 50)) < 0.05
+    rasters = {}
+    for precision in WEIGHT_PRECISIONS:
+        random.seed(1)
+        quantized = SpikingNeuralNetwork(weight_precision=precision)
+        for i in range(50):
+            quantized.add_neuron(f"entity{i}").threshold = 1.0
+        rasters[precision] = quantized.run(inputs_matrix)
+        weight_bytes = quantized.synapse_store.weight.itemsize
+        matched = (rasters[precision] & rasters["float64"]).sum() / rasters["float64"].sum()
+        agreement = (rasters[precision] == rasters["float64"]).mean()
+        print(f"{precision}: {weight_bytes} bytes per weight, spike rate {rasters[precision].mean():.1%}, "
+              f"{matched:.1%} of float64 spikes reproduced, {agreement:.1%} of raster matches")
+    assert 0.1 < rasters["float64"].mean() < 0.9
+    standalone = Synapse(0.5, store=SynapseStore("uint8"))
+    standalone.adjust_weight(0, 1)
+    assert 152 <= standalone._store.weight[0] <= 154  # 0.5 * 255 + 0.1 * 255, rounded stochastically
     # Test analyze_expression
     print("Analyzing expression '5 + 5 + 5':", snn.analyze_expression("5 + 5 + 5"))  # Should suggest 5 * 3
     print("Analyzing expression 'sin(90) + sin(90)':", snn.analyze_expression("sin(90) + sin(90)"))  # Should suggest 2 * sin(90)
@@ -0,0 +1,139 @@
+# spike_encoder.py
+import re
+import time
+import queue
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from snn import SpikingNeuralNetwork
+
+logger = logging.getLogger(__name__)
+
+
+class SpikeEncoder:
+    """
+    Streams chat inputs into the SNN as spikes, off the request path.
+
+    `submit` only enqueues the raw text. A background thread batches everything
+    received within a time window, tokenizes it against a fixed vocabulary
+    (LanguageUtils keywords, supported function names and operators), interns each
+    token to a neuron once, and steps the network once per window with a spike on
+    every neuron whose token occurred. Steps hold the network's lock, so they
+    interleave safely with steps submitted through the scheduler.
+    """
+
+    def __init__(self, snn: SpikingNeuralNetwork, keywords: Iterable[str], function_names: Iterable[str],
+                 window: float = 0.05, max_pending: int = 10000):
+        """
+        Initializes the vocabulary and starts the background thread.
+
+        Args:
+            snn (SpikingNeuralNetwork): The network to drive.
+            keywords (Iterable[str]): Natural language keywords, e.g. `LanguageUtils.math_keywords`.
+            function_names (Iterable[str]): Function names, e.g. `MathUtils.supported_functions`.
+            window (float): Seconds of traffic batched into one step. Defaults to 0.05.
+            max_pending (int): Inputs buffered before new ones are dropped. Defaults to 10000.
+        """
+        self.snn = snn
+        self.window = window
+        vocabulary = sorted({*keywords, *function_names}, key=len, reverse=True)
+        # Longest first so "log10" wins over "log" and "divided by" is one token
+        self.token_pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(token) for token in vocabulary) + r')\b|[-+*/^]',
+            re.IGNORECASE
+        )
+        self.token_to_neuron: Dict[str, int] = {}
+        self._pending: queue.Queue = queue.Queue(max_pending)
+        self.steps = 0
+        self.tokens = 0
+        self.dropped = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="spike-encoder", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> None:
+        """Queue an input for encoding; never blocks, drops the input if the buffer is full."""
+        try:
+            self._pending.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+
+    def tokenize(self, text: str) -> List[str]:
+        """Return the vocabulary tokens of an input, lowercased, in order."""
+        return [token.lower() for token in self.token_pattern.findall(text)]
+
+    def _intern(self, token: str) -> int:
+        """Return the neuron index of a token, adding the neuron on first use."""
+        neuron_index = self.token_to_neuron.get(token)
+        if neuron_index is None:
+            with self.snn.lock:  # A scheduled step may add the same entity concurrently
+                if token not in self.snn.entity_to_neuron:
+                    self.snn.add_neuron(token)
+                neuron_index = self.token_to_neuron[token] = self.snn.entity_to_neuron[token]
+        return neuron_index
+
+    def _drain(self) -> List[str]:
+        """Collect every input that arrives within one window."""
+        try:
+            texts = [self._pending.get(timeout=self.window)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.window
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                texts.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return texts
+
+    def _run(self) -> None:
+        """Background loop: one SNN step per window of traffic."""
+        while not (self._stopped.is_set() and self._pending.empty()):
+            texts = self._drain()
+            if texts:
+                self.encode(texts)
+
+    def encode(self, texts: List[str]) -> None:
+        """Step the network once with a spike for every token occurring in the texts."""
+        counts = Counter(token for text in texts for token in self.tokenize(text))
+        if not counts:
+            return
+        neuron_indices = [self._intern(token) for token in counts]
+        try:
+            self.snn.run(np.ones((1, len(neuron_indices))), neuron_indices=neuron_indices)
+        except ValueError as e:
+            logger.error("Spike encoder step failed: %s", e)
+            return
+        self.steps += 1
+        self.tokens += sum(counts.values())
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Encode everything still queued, then stop the background thread."""
+        self._stopped.set()
+        self._thread.join(timeout)
+
+
+# Test for spike_encoder.py
+if __name__ == "__main__":
+    from language_utils import LanguageUtils
+    from math_utils import MathUtils
+    from logging_utils import setup_logging
+    setup_logging()
+    print("Testing spike_encoder.py...")
+    snn = SpikingNeuralNetwork()
+    encoder = SpikeEncoder(snn, LanguageUtils().math_keywords, MathUtils().supported_functions)
+    print("Tokens:", encoder.tokenize("What is the square root of 25 plus sqrt(16)?"))
+    assert encoder.tokenize("log10(5) divided by 2") == ["log10", "divided by"]
+    start = time.perf_counter()
+    for i in range(1000):
+        encoder.submit(f"sqrt({i}) + sin of {i} degrees times 2")
+    submit_us = (time.perf_counter() - start) / 1000 * 1e6
+    encoder.stop()
+    print(f"Submit cost: {submit_us:.2f} us per input; {encoder.steps} step(s), {encoder.tokens} tokens")
+    assert encoder.tokens == 4000 and encoder.steps >= 1
+    assert set(snn.entity_to_neuron) == {"sqrt", "+", "sin of", "times"}
+    print("All tests passed!")
@@ -32,8 +32,20 @@ test_cases = [
     "det([[1, 2], [3, 4]])",
     "inv([[1, 2], [3, 4]])",
     
+    # Formulas recomputed when their inputs change
+    "z = 16",
+    "f = x * 2 + sqrt(z)",
+    "x = 3",
+
+    # Multi-statement scripts
+    "a = 3; b = 4; sqrt(a^2 + b^2) * 2; sqrt(a^2 + b^2) + a",
+
     # Get variables
     "get_variables",
+
+    # History queries
+    "history search sqrt",
+    "history top 3",
     
     # Complex expressions
     "(5 + 3) * 4",
@@ -51,6 +63,7 @@ test_cases = [
     "What is 10 minus 3?",
     "Calculate the square root of 64.",
     "What is the factorial of 5?",
+    "What is the factorial of 100000?",
     "What is the absolute value of -7?",
     "What is 2 times 3?",
     "What is 10 divided by 2?",
@@ -60,6 +73,7 @@ test_cases = [
     # New test cases for higher math operations
     "d/dx(sin(x))",  # Derivative of sin(x)
     "integrate(cos(x), x)",  # Integral of cos(x)
+    "integrate(x^2, x, 0, 1)",  # Definite integral, symbolic or numeric
     "det([[2, 0], [0, 2]])",  # Determinant of a 2x2 matrix
     "inv([[2, 0], [0, 2]])",  # Inverse of a 2x2 matrix
 ]